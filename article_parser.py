@@ -1,41 +1,1805 @@
-import requests
-import feedparser
-import json
-from datetime import datetime
 import time
-import schedule
+
+# Начало импорта модуля - для замера времени холодного старта
+_IMPORT_STARTED = time.perf_counter()
+
+import json
+import re
+import calendar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import random
 import logging
 import os
 import sys
+import threading
+import hashlib
+import gzip
+import math
+import struct
+import socket
+import ipaddress
+import zlib
+import heapq
+import queue
+import sqlite3
+import argparse
+from collections import deque
+from itertools import chain
+from html import unescape as html_unescape
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from dotenv import load_dotenv
-from supabase import create_client, Client
 from pathlib import Path
 
-class ArticleParser:
-    def __init__(self):
-        # Настройка логирования
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('parser.log'),
-                logging.StreamHandler()
+# Тяжелые зависимости (supabase, requests, feedparser, lxml) импортируются
+# при первом использовании, чтобы не замедлять запуск коротких задач
+
+class FeedCache:
+    """Постоянный кэш HTTP-валидаторов (ETag / Last-Modified) для условных запросов к фидам
+    
+    Кроме валидаторов для каждого фида хранится отметка последнего опроса
+    (см. ArticleParser._extract_articles): хэши недавних записей и время самой новой из них.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Есть изменения, не сохраненные в файл
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Загрузка кэша из JSON-файла"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r') as f:
+            data = json.load(f)
+        with self._lock:
+            self._entries = data if isinstance(data, dict) else {}
+
+    def save(self):
+        """Атомарное сохранение кэша в JSON-файл"""
+        with self._lock:
+            data = json.dumps(self._entries, ensure_ascii=False, indent=2)
+            self.dirty = False
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def conditional_headers(self, url):
+        """Заголовки условного запроса для фида"""
+        with self._lock:
+            entry = self._entries.get(url) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    @staticmethod
+    def validators(response_headers):
+        """Валидаторы из заголовков ответа сервера"""
+        return {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+        }
+
+    def update(self, url, fields):
+        """Запоминание полей записи фида (валидаторов, отметки опроса)"""
+        if not fields:
+            return
+        with self._lock:
+            entry = dict(self._entries.get(url) or {})
+            entry.update(fields)
+            if entry != self._entries.get(url):
+                self._entries[url] = entry
+                self.dirty = True
+
+    def marks(self, url):
+        """Отметка последнего опроса фида (пустой словарь, если ее нет)"""
+        with self._lock:
+            entry = self._entries.get(url) or {}
+            return dict(entry.get('marks') or {})
+
+    def get(self, url):
+        """Текущие валидаторы и отметка фида (или None)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            return dict(entry) if entry else None
+
+    def merge_stats(self, hits, misses):
+        """Добавление счетчиков попаданий из другого процесса"""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def record(self, not_modified):
+        """Учет попадания (304) или промаха (полная загрузка)"""
+        with self._lock:
+            if not_modified:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def reset_stats(self):
+        """Сброс счетчиков попаданий за цикл"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+# Параметры запроса, не влияющие на содержимое статьи (метки трекинга)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'yclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'ref', 'ref_src', 'cmpid', 'ncid', 'guccounter', 'sr_share', 'ito', '_ga',
+}
+
+def normalize_url(url):
+    """Нормализация URL статьи для поиска повторов
+    
+    Схема приводится к https, хост - к нижнему регистру без www и порта по умолчанию,
+    удаляются метки трекинга (utm_* и т.п.), фрагмент и завершающий слэш,
+    оставшиеся параметры сортируются.
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parsed.port and parsed.port not in (80, 443):
+        host = f"{host}:{parsed.port}"
+        
+    path = parsed.path or '/'
+    while '//' in path:
+        path = path.replace('//', '/')
+    if len(path) > 1:
+        path = path.rstrip('/')
+        
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunparse(('https', host, path, '', urlencode(query), ''))
+
+class KeywordMatcher:
+    """Поиск ключевых слов одним заранее скомпилированным регулярным выражением
+    
+    Ключевые слова ищутся с начала слова, поэтому 'ai' не находится в 'email',
+    а 'ai company' - в 'dubai company'; составные слова вроде 'openai' нужно
+    добавлять в набор отдельно. Короткие ключевые слова (не длиннее SHORT_KEYWORD
+    символов) должны и заканчиваться на границе слова (допускается окончание
+    множественного числа): 'ml' не находится в 'mlops'. Остальные могут быть
+    началом более длинного слова ('chatbot' находится в 'chatbots'). Пробелы
+    внутри фраз совпадают с любыми пробельными символами.
+    
+    Выражение строится в виде префиксного дерева. В длинных текстах (от
+    SCAN_MIN_LENGTH символов) оно не проверяется в каждой позиции: позиции-
+    кандидаты сначала ищутся str.find по первым словам ключевых слов.
+    """
+
+    SHORT_KEYWORD = 3
+    SCAN_MIN_LENGTH = 512
+
+    def __init__(self, keywords):
+        self.keywords = self.normalize(keywords)
+        self._regex = None
+        self._prefixes = ()
+        short = [keyword for keyword in self.keywords if len(keyword) <= self.SHORT_KEYWORD]
+        other = [keyword for keyword in self.keywords if len(keyword) > self.SHORT_KEYWORD]
+        # Сначала длинные слова, чтобы 'ai model' находилось целиком, а не как 'ai'
+        patterns = []
+        if other:
+            patterns.append(self._trie_pattern(other))
+        if short:
+            patterns.append(rf'(?:{self._trie_pattern(short)})(?:e?s)?\b')
+        if patterns:
+            self._regex = re.compile(r'\b(?:' + '|'.join(patterns) + ')')
+            
+        # Любое совпадение начинается с первого слова ключевого слова; слова,
+        # которые начинаются с другого такого же слова, отдельно не ищутся
+        prefixes = []
+        for word in sorted({keyword.split(' ', 1)[0] for keyword in self.keywords}):
+            if not prefixes or not word.startswith(prefixes[-1]):
+                prefixes.append(word)
+        self._prefixes = tuple(prefixes)
+
+    @staticmethod
+    def normalize(keywords):
+        """Ключевые слова в нижнем регистре без пустых строк и повторов"""
+        return tuple(dict.fromkeys(k.strip().lower() for k in keywords if k and k.strip()))
+
+    @staticmethod
+    def _trie_pattern(keywords):
+        """Регулярное выражение для набора слов в виде префиксного дерева"""
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        def build(node):
+            branches = [
+                re.escape(char).replace(r'\ ', r'\s+') + build(child)
+                for char, child in sorted(node.items()) if char
             ]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            # Слово может закончиться в этом узле - продолжение необязательно
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def _iter_matches(self, text):
+        """Совпадения в позициях-кандидатах длинного текста (в нижнем регистре, без порядка)"""
+        match = self._regex.match
+        for prefix in self._prefixes:
+            position = text.find(prefix)
+            while position != -1:
+                # Середину слова отбрасываем без вызова регулярного выражения
+                if position == 0 or not (text[position - 1].isalnum() or text[position - 1] == '_'):
+                    found = match(text, position)
+                    if found is not None:
+                        yield found
+                position = text.find(prefix, position + 1)
+
+    def search(self, text):
+        """Есть ли в тексте хотя бы одно ключевое слово"""
+        if not text or self._regex is None:
+            return False
+        text = text.lower()
+        # В коротком тексте вызовы str.find дороже проверки всех позиций
+        if len(text) < self.SCAN_MIN_LENGTH:
+            return self._regex.search(text) is not None
+        return next(self._iter_matches(text), None) is not None
+
+    def find_all(self, text):
+        """Множество найденных в тексте ключевых слов"""
+        if not text or self._regex is None:
+            return set()
+        text = text.lower()
+        if len(text) < self.SCAN_MIN_LENGTH:
+            matches = self._regex.finditer(text)
+        else:
+            matches = sorted(self._iter_matches(text), key=lambda m: m.start())
+        found = set()
+        matched_until = 0
+        # Непересекающиеся совпадения слева направо, как у finditer
+        for match in matches:
+            if match.start() < matched_until:
+                continue
+            matched_until = match.end()
+            phrase = ' '.join(match.group(0).split())
+            if phrase not in self.keywords:
+                # Убираем окончание множественного числа
+                phrase = phrase[:-2] if phrase[:-2] in self.keywords else phrase[:-1]
+            found.add(phrase)
+        return found
+
+class SourceRegistry:
+    """Источники и наборы ключевых слов из файла JSON или YAML
+    
+    Формат файла - см. sources.example.json: словарь keywords (категория -> список
+    ключевых слов), необязательный словарь defaults с настройками по умолчанию и
+    список sources. Настройки источника: name, url, category, parse_method,
+    timeout (секунды), weight (доля в общем лимите одновременных загрузок),
+    min_interval и max_interval (границы интервала опроса в минутах), enabled.
+    """
+
+    PARSE_METHODS = ('direct_request',)
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._signature = None
+
+    def _stat_signature(self):
+        stat = self.path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self):
+        """Изменился ли файл с момента последней загрузки"""
+        try:
+            return self._stat_signature() != self._signature
+        except OSError:
+            return False
+
+    def load(self):
+        """Чтение и проверка файла; возвращает кортеж (источники, ключевые слова по категориям)"""
+        # Версия файла запоминается до разбора: ошибочный файл не перечитывается до следующего изменения
+        self._signature = self._stat_signature()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            if self.path.suffix.lower() in ('.yaml', '.yml'):
+                try:
+                    import yaml
+                except ImportError:
+                    raise RuntimeError("Для файла источников в формате YAML требуется пакет PyYAML")
+                data = yaml.safe_load(f) or {}
+            else:
+                data = json.load(f)
+        return self._validate(data)
+
+    def _validate(self, data):
+        if not isinstance(data, dict) or not isinstance(data.get('sources'), list):
+            raise ValueError(f"{self.path}: ожидается объект со списком sources")
+            
+        keywords = data.get('keywords') or {}
+        if not isinstance(keywords, dict) or not all(isinstance(words, list) for words in keywords.values()):
+            raise ValueError(f"{self.path}: keywords должен сопоставлять категории списки ключевых слов")
+            
+        defaults = data.get('defaults') or {}
+        sources = []
+        urls = set()
+        for position, item in enumerate(data['sources'], 1):
+            source = {**defaults, **item}
+            if not source.get('name') or not source.get('url'):
+                raise ValueError(f"{self.path}: у источника №{position} не заданы name и url")
+            if source['url'] in urls:
+                raise ValueError(f"{self.path}: источник {source['url']} указан дважды")
+            if source.get('parse_method') not in (None,) + self.PARSE_METHODS:
+                raise ValueError(f"{self.path}: неизвестный parse_method {source['parse_method']!r} у {source['name']}")
+            for key in ('timeout', 'weight', 'min_interval', 'max_interval'):
+                if key in source and not (isinstance(source[key], (int, float)) and source[key] > 0):
+                    raise ValueError(f"{self.path}: {key} у {source['name']} должен быть положительным числом")
+            if not source.pop('enabled', True):
+                continue
+            source.setdefault('type', 'rss')
+            source.setdefault('category', '')
+            urls.add(source['url'])
+            sources.append(source)
+        return sources, keywords
+
+class WeightedSemaphore:
+    """Семафор, в котором задача занимает weight единиц из capacity
+    
+    Задача с весом больше capacity занимает все единицы.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self._available = self.capacity
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def hold(self, weight=1):
+        weight = min(max(1, int(weight)), self.capacity)
+        with self._condition:
+            self._condition.wait_for(lambda: self._available >= weight)
+            self._available -= weight
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._available += weight
+                self._condition.notify_all()
+
+class SeenUrlIndex:
+    """Фильтр Блума по нормализованным URL уже сохраненных статей
+    
+    Объем памяти фиксирован и задается ожидаемым числом URL (capacity) и долей
+    ложных срабатываний (error_rate): около 29 бит на URL при error_rate=1e-6.
+    Ложное срабатывание означает пропуск новой статьи, поэтому доля выбрана малой.
+    complete - индекс содержит все URL хранилища (заполнение не прерывалось ошибкой).
+    """
+
+    MAGIC = b'SEENIDX2'
+    HEADER = struct.Struct('<8sQQQQ')
+
+    def __init__(self, capacity=2000000, error_rate=1e-6):
+        self.capacity = max(1, int(capacity))
+        self.num_bits = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / self.capacity * math.log(2))))
+        self.count = 0
+        self.complete = True
+        # Есть URL, не сохраненные в файл
+        self.dirty = False
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, url):
+        """Позиции битов для URL (двойное хеширование одного дайджеста)"""
+        digest = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        h2 |= 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, url):
+        positions = self._positions(url)
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+    def add(self, url):
+        """Добавление URL в индекс"""
+        positions = self._positions(url)
+        with self._lock:
+            bits = self._bits
+            added = False
+            for pos in positions:
+                mask = 1 << (pos & 7)
+                if not bits[pos >> 3] & mask:
+                    bits[pos >> 3] |= mask
+                    added = True
+            if added:
+                self.count += 1
+                self.dirty = True
+
+    @property
+    def saturated(self):
+        """Индекс заполнен сверх расчетной емкости"""
+        return self.count > self.capacity
+
+    def save(self, path):
+        """Атомарное сохранение индекса в компактный бинарный файл"""
+        path = Path(path)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with self._lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.num_bits, self.num_hashes, self.count,
+                                         int(self.complete)))
+                f.write(self._bits)
+            self.dirty = False
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, capacity=2000000, error_rate=1e-6):
+        """Загрузка индекса из файла; при несовпадении параметров возвращает None"""
+        index = cls(capacity, error_rate)
+        with open(path, 'rb') as f:
+            magic, num_bits, num_hashes, count, complete = cls.HEADER.unpack(f.read(cls.HEADER.size))
+            if magic != cls.MAGIC or num_bits != index.num_bits or num_hashes != index.num_hashes:
+                return None
+            bits = bytearray(f.read())
+        if len(bits) != len(index._bits):
+            return None
+        index._bits = bits
+        index.count = count
+        index.complete = bool(complete)
+        return index
+
+class NearDuplicateIndex:
+    """Поиск почти одинаковых статей по SimHash заголовка и описания
+    
+    64-битные отпечатки разбиваются на bands полос: статьи, отличающиеся не
+    более чем в max_distance битах (max_distance < bands), обязательно совпадают
+    хотя бы в одной полосе, поэтому сравнивается лишь небольшое число кандидатов.
+    Индекс хранится в памяти и содержит только статьи за последние window_hours;
+    уже сохраненные статьи за это окно добавляются через add().
+    """
+
+    BITS = 64
+    # Счетчики 64 битов упаковываются в одно целое, по LANE бит на счетчик
+    LANE = 24
+    # Учитываются первые MAX_WORDS слов текста
+    MAX_WORDS = 500
+    # Позиция байта хэша -> значение байта -> его биты, разнесенные по счетчикам
+    _BYTE_LANES = [
+        [sum(1 << (24 * (8 * position + bit)) for bit in range(8) if value >> bit & 1) for value in range(256)]
+        for position in range(8)
+    ]
+
+    def __init__(self, window_hours=72, max_distance=3, bands=4):
+        if self.BITS % bands or max_distance >= bands:
+            raise ValueError("bands должно делить 64 и быть больше max_distance")
+        self.window = window_hours * 3600
+        self.max_distance = max_distance
+        self.bands = bands
+        self._band_bits = self.BITS // bands
+        self._band_mask = (1 << self._band_bits) - 1
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(bands)]
+        # Статьи в порядке добавления: (время, отпечаток, URL, URL первой статьи кластера)
+        self._entries = deque()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _tokens(text):
+        """Слова и пары соседних слов текста без HTML-разметки"""
+        text = html_unescape(re.sub(r'<[^>]+>', ' ', text)).lower()
+        words = re.findall(r'\w{2,}', text)[:NearDuplicateIndex.MAX_WORDS]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    @classmethod
+    def fingerprint(cls, text):
+        """64-битный SimHash текста"""
+        weights = {}
+        for token in cls._tokens(text):
+            weights[token] = weights.get(token, 0) + 1
+        if not weights:
+            return None
+            
+        # Сумма весов слов, у которых установлен каждый из 64 битов хэша
+        packed = 0
+        total = 0
+        lanes = cls._BYTE_LANES
+        for token, weight in weights.items():
+            digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+            packed += weight * (lanes[0][digest[0]] | lanes[1][digest[1]] | lanes[2][digest[2]] |
+                                lanes[3][digest[3]] | lanes[4][digest[4]] | lanes[5][digest[5]] |
+                                lanes[6][digest[6]] | lanes[7][digest[7]])
+            total += weight
+            
+        fingerprint = 0
+        lane_mask = (1 << cls.LANE) - 1
+        for bit in range(cls.BITS):
+            if 2 * ((packed >> (cls.LANE * bit)) & lane_mask) > total:
+                fingerprint |= 1 << bit
+        return fingerprint
+
+    def _band_keys(self, fingerprint):
+        return [(fingerprint >> (band * self._band_bits)) & self._band_mask for band in range(self.bands)]
+
+    def _expire(self, now):
+        """Удаление статей, вышедших за окно"""
+        while self._entries and self._entries[0][0] < now - self.window:
+            entry = self._entries.popleft()
+            for bucket, key in zip(self._buckets, self._band_keys(entry[1])):
+                members = bucket.get(key)
+                if members is not None:
+                    members.discard(entry)
+                    if not members:
+                        del bucket[key]
+
+    def match(self, url, text, now=None):
+        """Проверка статьи и добавление ее в индекс
+        
+        Возвращает URL первой статьи кластера, если статья почти совпадает
+        с одной из недавних, иначе None.
+        """
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return None
+        now = time.time() if now is None else now
+        keys = self._band_keys(fingerprint)
+        
+        with self._lock:
+            self._expire(now)
+            best = None
+            best_distance = self.max_distance + 1
+            for bucket, key in zip(self._buckets, keys):
+                for candidate in bucket.get(key, ()):
+                    if candidate[2] == url:
+                        # Та же статья, повторно встреченная в фиде
+                        return None
+                    distance = bin(candidate[1] ^ fingerprint).count('1')
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+                        
+            cluster = best[3] if best is not None else url
+            self._insert((now, fingerprint, url, cluster), keys)
+            return best[3] if best is not None else None
+
+    def add(self, url, text, added_at, cluster=None):
+        """Добавление сохраненной ранее статьи без проверки (статьи - в порядке добавления)"""
+        fingerprint = self.fingerprint(text)
+        if fingerprint is None:
+            return
+        with self._lock:
+            self._insert((added_at, fingerprint, url, cluster or url), self._band_keys(fingerprint))
+
+    def _insert(self, entry, keys):
+        self._entries.append(entry)
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, set()).add(entry)
+
+class FeedTooLargeError(Exception):
+    """Тело ответа фида превышает допустимый размер"""
+
+def _peak_rss_bytes():
+    """Пиковый объем резидентной памяти процесса в байтах (None, если недоступен)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux возвращает килобайты, macOS - байты
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _accept_encoding():
+    """Поддерживаемые методы сжатия ответа (br - если установлен пакет brotli)"""
+    encodings = ['gzip', 'deflate']
+    try:
+        import brotli  # noqa: F401
+        encodings.append('br')
+    except ImportError:
+        pass
+    return ', '.join(encodings)
+
+class DnsCache:
+    """Кэш результатов socket.getaddrinfo с ограниченным временем жизни
+    
+    requests не позволяет подменить резолвер, поэтому кэш устанавливается
+    на уровне процесса вместо socket.getaddrinfo - он действует на все
+    соединения процесса, а не только на запросы парсера, до вызова uninstall().
+    Кэшируются только успешные ответы для доменных имен; IP-адреса резолвятся
+    как обычно. Устаревшие записи удаляются не реже раза в ttl секунд.
+    """
+
+    _installed = None
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._getaddrinfo = socket.getaddrinfo
+        self._next_prune = time.monotonic() + ttl
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def install(cls, ttl=300):
+        """Установка кэша для процесса (повторный вызов возвращает уже установленный)"""
+        if cls._installed is None:
+            cache = cls(ttl)
+            socket.getaddrinfo = cache
+            cls._installed = cache
+        return cls._installed
+
+    @classmethod
+    def uninstall(cls):
+        """Восстановление исходного socket.getaddrinfo"""
+        if cls._installed is not None:
+            socket.getaddrinfo = cls._installed._getaddrinfo
+            cls._installed = None
+
+    def __call__(self, host, port, family=0, type=0, proto=0, flags=0):
+        if not self._is_hostname(host):
+            return self._getaddrinfo(host, port, family, type, proto, flags)
+            
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+                
+        result = self._getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (now + self.ttl, result)
+            if now >= self._next_prune:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                self._next_prune = now + self.ttl
+        return result
+
+    @staticmethod
+    def _is_hostname(host):
+        if not host:
+            return False
+        if isinstance(host, bytes):
+            host = host.decode('ascii', 'ignore')
+        try:
+            ipaddress.ip_address(host)
+            return False
+        except ValueError:
+            return True
+
+def _counting_http_adapter(on_new_connection, **kwargs):
+    """HTTPAdapter, считающий установленные соединения в пулах urllib3
+    
+    Сравнение числа запросов с числом новых соединений показывает, сколько
+    раз соединение (и TLS-сессия) было переиспользовано.
+    """
+    from requests.adapters import HTTPAdapter
+
+    def counting_pool(pool_class):
+        # Считаем установку соединения, а не создание объекта: urllib3
+        # переподключает закрытое сервером соединение без создания нового
+        class CountingConnection(pool_class.ConnectionCls):
+            def connect(self):
+                on_new_connection()
+                return super().connect()
+                
+        class CountingPool(pool_class):
+            ConnectionCls = CountingConnection
+        return CountingPool
+
+    class CountingHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                scheme: counting_pool(pool_class)
+                for scheme, pool_class in self.poolmanager.pool_classes_by_scheme.items()
+            }
+
+    return CountingHTTPAdapter(**kwargs)
+
+class ParserMetrics:
+    """Метрики работы парсера: счетчики и длительности этапов
+    
+    Хранятся накопительные значения (для экспорта в формате Prometheus)
+    и значения текущего цикла (для JSON-сводки по итогам process_articles).
+    """
+
+    PREFIX = 'article_parser_'
+    HELP = {
+        'fetch_seconds': 'Время загрузки фида',
+        'response_bytes': 'Размер ответа фида в байтах',
+        'feed_rss_growth_bytes': 'Рост пикового объема памяти процесса при обработке фида',
+        'process_peak_rss_bytes': 'Пиковый объем памяти процесса по итогам цикла',
+        'parse_seconds': 'Время разбора фида',
+        'keyword_filter_seconds': 'Время фильтрации записей по ключевым словам',
+        'save_seconds': 'Время записи пакета статей в хранилище',
+        'cycle_seconds': 'Длительность цикла обработки',
+        'entries_seen_total': 'Обработанных записей загруженных фидов',
+        'entries_known_total': 'Записей, пропущенных по отметке прошлого опроса',
+        'entries_filtered_total': 'Записей, отброшенных фильтром по тематике',
+        'entries_duplicate_total': 'Статей, уже имеющихся в хранилище',
+        'entries_inserted_total': 'Добавленных статей',
+        'entries_near_duplicate_total': 'Статей, почти совпадающих с недавними статьями других источников',
+        'feeds_not_modified_total': 'Фидов без изменений (304)',
+        'http_requests_total': 'HTTP-запросов',
+        'http_connections_new_total': 'Новых HTTP-соединений',
+        'http_connections_reused_total': 'Запросов по переиспользованному соединению',
+        'content_fetch_seconds': 'Время загрузки страницы статьи',
+        'content_bytes': 'Размер загруженной страницы статьи в байтах',
+        'content_extract_seconds': 'Время извлечения текста статьи',
+        'content_fetched_total': 'Загруженных страниц статей',
+        'content_cache_hits_total': 'Страниц статей, взятых из кэша',
+        'queue_retries_total': 'Заданий очереди, возвращенных для повтора после ошибки',
+        'queue_failed_total': 'Заданий очереди, исчерпавших попытки',
+        'errors_total': 'Ошибок по типам',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+        self._cycle_counters = {}
+        self._cycle_summaries = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Увеличение счетчика"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._cycle_counters[key] = self._cycle_counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Добавление наблюдения (длительность, размер) в сводку"""
+        key = self._key(name, labels)
+        with self._lock:
+            for summaries in (self._summaries, self._cycle_summaries):
+                summary = summaries.setdefault(key, [0, 0.0, 0.0])
+                summary[0] += 1
+                summary[1] += value
+                summary[2] = max(summary[2], value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Замер длительности блока кода в секундах"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def start_cycle(self):
+        """Начало нового цикла: сброс значений текущего цикла"""
+        with self._lock:
+            self._cycle_counters = {}
+            self._cycle_summaries = {}
+
+    def cycle_snapshot(self):
+        """Значения текущего цикла для передачи между процессами"""
+        with self._lock:
+            return {
+                'counters': dict(self._cycle_counters),
+                'summaries': {key: list(value) for key, value in self._cycle_summaries.items()},
+            }
+
+    def merge(self, snapshot):
+        """Добавление значений, собранных в другом процессе"""
+        with self._lock:
+            for key, value in snapshot['counters'].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+                self._cycle_counters[key] = self._cycle_counters.get(key, 0) + value
+            for key, (count, total, peak) in snapshot['summaries'].items():
+                for summaries in (self._summaries, self._cycle_summaries):
+                    summary = summaries.setdefault(key, [0, 0.0, 0.0])
+                    summary[0] += count
+                    summary[1] += total
+                    summary[2] = max(summary[2], peak)
+
+    def cycle_summary(self):
+        """Сводка текущего цикла в виде словаря для JSON"""
+        snapshot = self.cycle_snapshot()
+        counters = {}
+        for (name, labels), value in sorted(snapshot['counters'].items()):
+            if labels:
+                counters.setdefault(name, {})[','.join(f'{k}={v}' for k, v in labels)] = value
+            else:
+                counters[name] = value
+                
+        stages = {}
+        for (name, labels), (count, total, peak) in snapshot['summaries'].items():
+            stage = stages.setdefault(name, {'count': 0, 'sum': 0.0, 'max': 0.0})
+            stage['count'] += count
+            stage['sum'] += total
+            stage['max'] = max(stage['max'], peak)
+        for stage in stages.values():
+            stage['avg'] = stage['sum'] / stage['count'] if stage['count'] else 0.0
+            
+        return {'counters': counters, 'stages': stages}
+
+    def render_prometheus(self):
+        """Накопительные значения в текстовом формате Prometheus"""
+        def format_labels(labels):
+            if not labels:
+                return ''
+            pairs = []
+            for key, value in labels:
+                value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                pairs.append(f'{key}="{value}"')
+            return '{' + ','.join(pairs) + '}'
+
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+            
+        lines = []
+        described = set()
+        for (name, labels), value in counters:
+            metric = self.PREFIX + name
+            if metric not in described:
+                described.add(metric)
+                lines.append(f"# HELP {metric} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{format_labels(labels)} {value}")
+        for (name, labels), (count, total, _) in summaries:
+            metric = self.PREFIX + name
+            if metric not in described:
+                described.add(metric)
+                lines.append(f"# HELP {metric} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count{format_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {total}")
+        return '\n'.join(lines) + '\n'
+
+    def start_http_server(self, port, host='127.0.0.1'):
+        """Запуск HTTP-сервера с эндпоинтом /metrics в фоновом потоке"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+class FeedScheduler:
+    """Планировщик опроса фидов с адаптивным интервалом для каждого фида
+    
+    Фиды хранятся в очереди с приоритетом по времени следующего опроса. Для
+    каждого фида ведется сглаженная оценка частоты новых статей: интервал
+    подбирается так, чтобы за один опрос появлялось около одной новой статьи,
+    и ограничен min_interval/max_interval (или min_interval/max_interval фида
+    в минутах). Фиды без новых статей опрашиваются все реже, а при ошибках
+    интервал растет экспоненциально.
+    """
+
+    def __init__(self, initial_interval=3600, min_interval=300, max_interval=86400,
+                 smoothing=0.5, jitter=0.1):
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max(max_interval, min_interval))
+        self.initial_interval = min(max(float(initial_interval), self.min_interval), self.max_interval)
+        self.smoothing = smoothing
+        self.jitter = jitter
+        self._states = {}
+        self._queue = []
+        self._counter = 0
+
+    def _push(self, url, next_run):
+        self._counter += 1
+        heapq.heappush(self._queue, (next_run, self._counter, url))
+
+    def _bounds(self, blog):
+        """Границы интервала опроса фида в секундах"""
+        min_interval = blog['min_interval'] * 60 if blog.get('min_interval') else self.min_interval
+        max_interval = blog['max_interval'] * 60 if blog.get('max_interval') else self.max_interval
+        return min_interval, max(max_interval, min_interval)
+
+    def add(self, blog, next_run=None):
+        """Добавление фида в расписание (по умолчанию - с немедленным опросом)"""
+        now = time.time()
+        min_interval, max_interval = self._bounds(blog)
+        self._states[blog['url']] = {
+            'blog': blog,
+            'interval': min(max(self.initial_interval, min_interval), max_interval),
+            'rate': None,
+            'errors': 0,
+            'last_success': None,
+            'next_run': now if next_run is None else next_run,
+        }
+        self._push(blog['url'], self._states[blog['url']]['next_run'])
+
+    def remove(self, url):
+        """Удаление фида из расписания (запись в очереди будет пропущена)"""
+        self._states.pop(url, None)
+
+    def urls(self):
+        """URL фидов в расписании"""
+        return set(self._states)
+
+    def refresh(self, blog):
+        """Замена настроек фида без сброса его статистики"""
+        state = self._states.get(blog['url'])
+        if state is None:
+            return False
+        state['blog'] = blog
+        min_interval, max_interval = self._bounds(blog)
+        state['interval'] = min(max(state['interval'], min_interval), max_interval)
+        return True
+
+    def pop_due(self, now=None):
+        """Извлечение фидов, время опроса которых наступило"""
+        now = time.time() if now is None else now
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_run, _, url = heapq.heappop(self._queue)
+            state = self._states.get(url)
+            # Устаревшие записи (фид удален или перепланирован) пропускаем
+            if state is None or state['next_run'] != next_run:
+                continue
+            due.append(state['blog'])
+        return due
+
+    def seconds_until_next(self, now=None):
+        """Время до ближайшего опроса в секундах"""
+        now = time.time() if now is None else now
+        while self._queue:
+            next_run, _, url = self._queue[0]
+            state = self._states.get(url)
+            if state is not None and state['next_run'] == next_run:
+                return max(0.0, next_run - now)
+            heapq.heappop(self._queue)
+        return self.max_interval
+
+    def update(self, blog, result, now=None):
+        """Перепланирование фида по итогам опроса; возвращает новый интервал"""
+        now = time.time() if now is None else now
+        state = self._states.get(blog['url'])
+        if state is None:
+            return None
+        min_interval, max_interval = self._bounds(state['blog'])
+            
+        if not result or result.get('error'):
+            # Экспоненциальная задержка при ошибках, базовый интервал не меняется
+            state['errors'] += 1
+            interval = min(max_interval, state['interval'] * (2 ** min(state['errors'], 16)))
+        else:
+            state['errors'] = 0
+            elapsed = now - state['last_success'] if state['last_success'] else state['interval']
+            state['last_success'] = now
+            observed = result.get('inserted', 0) / max(elapsed, 1.0)
+            if state['rate'] is None:
+                state['rate'] = observed
+            else:
+                state['rate'] = self.smoothing * observed + (1 - self.smoothing) * state['rate']
+                
+            if state['rate'] > 0:
+                interval = 1.0 / state['rate']
+            else:
+                interval = state['interval'] * 2
+            # Интервал меняется плавно: не более чем вдвое за один опрос
+            interval = min(max(interval, state['interval'] / 2), state['interval'] * 2)
+            interval = min(max(interval, min_interval), max_interval)
+            state['interval'] = interval
+            
+        # Случайный разброс, чтобы фиды не опрашивались синхронно
+        interval *= 1 + random.uniform(-self.jitter, self.jitter)
+        state['next_run'] = now + interval
+        self._push(blog['url'], state['next_run'])
+        return interval
+
+class ContentCache:
+    """Дисковый кэш страниц статей с адресацией по содержимому
+    
+    Тело страницы хранится сжатым в objects/<sha256 тела>.gz, а для каждого
+    (нормализованного) URL в urls/ записывается ссылка на хэш, поэтому страница
+    не загружается повторно, а одинаковые страницы хранятся один раз.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _url_path(self, url):
+        key = hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=16).hexdigest()
+        return self.directory / 'urls' / key[:2] / key
+
+    def _object_path(self, digest):
+        return self.directory / 'objects' / digest[:2] / f"{digest}.gz"
+
+    @staticmethod
+    def _write_atomic(path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url):
+        """Тело страницы из кэша (или None)"""
+        try:
+            digest = self._url_path(url).read_text().strip()
+            return gzip.decompress(self._object_path(digest).read_bytes())
+        except (OSError, EOFError, gzip.BadGzipFile):
+            return None
+
+    def put(self, url, body):
+        """Сохранение тела страницы; возвращает его хэш"""
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not object_path.exists():
+            self._write_atomic(object_path, gzip.compress(body, compresslevel=6))
+        self._write_atomic(self._url_path(url), digest.encode('ascii'))
+        return digest
+
+# Элементы страницы, не относящиеся к тексту статьи
+_BOILERPLATE_TAGS = ('script', 'style', 'noscript', 'iframe', 'svg', 'form', 'button',
+                     'nav', 'header', 'footer', 'aside')
+_UNLIKELY_BLOCK = re.compile(r'comment|sidebar|footer|related|share|social|promo|advert|banner|'
+                             r'menu|newsletter|subscribe|cookie|popup|breadcrumb|sponsor', re.I)
+_LIKELY_BLOCK = re.compile(r'article|content|body|entry|main|post|story|text', re.I)
+_TEXT_TAGS = ('p', 'h2', 'h3', 'h4', 'li', 'pre', 'blockquote')
+
+def _class_weight(element):
+    """Поправка к счету блока по его class и id"""
+    hints = f"{element.get('class', '')} {element.get('id', '')}"
+    weight = 0
+    if _UNLIKELY_BLOCK.search(hints):
+        weight -= 25
+    if _LIKELY_BLOCK.search(hints):
+        weight += 25
+    return weight
+
+def _link_density(element):
+    """Доля текста блока, находящегося внутри ссылок"""
+    text_length = len(element.text_content())
+    if not text_length:
+        return 1.0
+    link_length = sum(len(link.text_content()) for link in element.iter('a'))
+    return link_length / text_length
+
+def _inside_text_block(element, root):
+    """Находится ли элемент внутри другого текстового элемента блока root"""
+    for ancestor in element.iterancestors():
+        if ancestor is root:
+            return False
+        if ancestor.tag in _TEXT_TAGS:
+            return True
+    return False
+
+def extract_main_text(html):
+    """Извлечение основного текста страницы (упрощенный алгоритм Readability)
+    
+    Служебные элементы удаляются, каждый абзац добавляет очки родительскому
+    блоку (и половину - следующему предку) в зависимости от длины и числа
+    запятых. Выбирается блок с наибольшим счетом с учетом доли ссылок,
+    из него берутся абзацы, заголовки и пункты списков.
+    """
+    from lxml import etree, html as lxml_html
+    try:
+        document = lxml_html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return ''
+    etree.strip_elements(document, *_BOILERPLATE_TAGS, etree.Comment, with_tail=False)
+    
+    # Блоки, которые по class/id явно не являются текстом статьи
+    for element in list(document.iter('div', 'section', 'ul', 'table', 'span')):
+        hints = f"{element.get('class', '')} {element.get('id', '')}"
+        if _UNLIKELY_BLOCK.search(hints) and not _LIKELY_BLOCK.search(hints):
+            element.drop_tree()
+            
+    scores = {}
+    for paragraph in document.iter('p', 'pre'):
+        text = paragraph.text_content().strip()
+        if len(text) < 25:
+            continue
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for node, share in ((parent, 1.0), (grandparent, 0.5)):
+            if node is None:
+                continue
+            if node not in scores:
+                scores[node] = _class_weight(node)
+            scores[node] += score * share
+            
+    if not scores:
+        return ''
+    best = max(scores, key=lambda node: scores[node] * (1 - _link_density(node)))
+    
+    blocks = []
+    for element in best.iter(*_TEXT_TAGS):
+        # Вложенные текстовые элементы уже вошли в текст внешнего
+        if _inside_text_block(element, best):
+            continue
+        text = ' '.join(element.text_content().split())
+        if text:
+            blocks.append(text)
+    return '\n\n'.join(blocks)
+
+# Хранилища статей: insert_batch(articles) записывает пакет (существующие URL пропускаются)
+# и возвращает добавленные статьи, iter_urls() перечисляет сохраненные URL, iter_recent(since)
+# перечисляет в порядке добавления статьи, добавленные не раньше since (Unix-время):
+# словари с полями url, title, summary, duplicate_of и added_at (Unix-время добавления)
+
+def _storage_timestamp(value):
+    """Unix-время из значения created_at хранилища (ISO 8601, без часового пояса - UTC)"""
+    if not value:
+        return None
+    value = str(value).strip().replace('Z', '+00:00')
+    # Postgres отбрасывает нули в конце долей секунды, а fromisoformat до Python 3.11
+    # принимает только 3 или 6 цифр
+    value = re.sub(r'\.(\d{1,6})\d*', lambda m: '.' + m.group(1).ljust(6, '0'), value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return calendar.timegm(parsed.timetuple()) + parsed.microsecond / 1e6
+    return parsed.timestamp()
+
+_RECENT_COLUMNS = ('url', 'title', 'summary', 'duplicate_of', 'created_at')
+
+class SupabaseStorage:
+    """Хранилище статей в таблице Links_articles Supabase"""
+
+    def __init__(self, get_client, table='Links_articles'):
+        # Клиент запрашивается при первой записи (см. ArticleParser.supabase)
+        self._get_client = get_client
+        self.table = table
+
+    def insert_batch(self, articles):
+        """Запись пакета через upsert(on_conflict='url') без перезаписи существующих статей"""
+        response = self._get_client().table(self.table).upsert(
+            articles, on_conflict='url', ignore_duplicates=True
+        ).execute()
+        if hasattr(response, 'error') and response.error:
+            raise RuntimeError(f"Ошибка пакетного добавления статей в Supabase: {response.error}")
+        # Supabase возвращает только реально добавленные строки
+        return response.data if response.data is not None else list(articles)
+
+    def iter_urls(self, page_size=1000):
+        """Постраничный перебор URL сохраненных статей"""
+        offset = 0
+        while True:
+            # Без сортировки Postgres не гарантирует порядок строк между страницами
+            response = self._get_client().table(self.table).select('url').order('id').range(
+                offset, offset + page_size - 1
+            ).execute()
+            rows = response.data or []
+            for row in rows:
+                if row.get('url'):
+                    yield row['url']
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+    def iter_recent(self, since, page_size=1000):
+        """Постраничный перебор статей, добавленных не раньше since"""
+        since_value = datetime.fromtimestamp(since, timezone.utc).isoformat()
+        offset = 0
+        while True:
+            response = self._get_client().table(self.table).select(','.join(_RECENT_COLUMNS)).gte(
+                'created_at', since_value
+            ).order('id').range(offset, offset + page_size - 1).execute()
+            rows = response.data or []
+            for row in rows:
+                yield dict(row, added_at=_storage_timestamp(row.get('created_at')))
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+    def close(self):
+        pass
+
+class SQLiteStorage:
+    """Локальное хранилище статей в SQLite (структура таблицы как в Supabase)
+    
+    Колонки, которых нет в таблице (новые поля статей), добавляются автоматически.
+    """
+
+    def __init__(self, path='articles.db', table='Links_articles'):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT UNIQUE NOT NULL,
+                title TEXT NOT NULL,
+                source TEXT NOT NULL,
+                category TEXT,
+                summary TEXT,
+                published_date TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'new'
+            )
+        """)
+        self._conn.execute(f'CREATE INDEX IF NOT EXISTS idx_links_articles_source ON "{table}" (source)')
+        self._conn.commit()
+        self._columns = {row[1] for row in self._conn.execute(f'PRAGMA table_info("{table}")')}
+
+    def _ensure_columns(self, names):
+        """Добавление недостающих колонок"""
+        for name in sorted(set(names) - self._columns):
+            if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', name):
+                raise ValueError(f"Недопустимое имя поля статьи: {name!r}")
+            self._conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN "{name}" TEXT')
+            self._columns.add(name)
+
+    @staticmethod
+    def _db_value(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    def insert_batch(self, articles):
+        """Запись пакета в одной транзакции, существующие URL пропускаются"""
+        inserted = []
+        with self._lock, self._conn:
+            self._ensure_columns(name for article in articles for name in article)
+            for article in articles:
+                columns = ', '.join(f'"{name}"' for name in article)
+                placeholders = ', '.join('?' for _ in article)
+                cursor = self._conn.execute(
+                    f'INSERT OR IGNORE INTO "{self.table}" ({columns}) VALUES ({placeholders})',
+                    [self._db_value(value) for value in article.values()]
+                )
+                if cursor.rowcount:
+                    inserted.append(article)
+        return inserted
+
+    def iter_urls(self, page_size=1000):
+        with self._lock:
+            urls = [row[0] for row in self._conn.execute(f'SELECT url FROM "{self.table}"')]
+        yield from urls
+
+    def iter_recent(self, since, page_size=1000):
+        # Колонки summary и duplicate_of появляются с первой статьей, где они есть
+        columns = [name for name in _RECENT_COLUMNS if name in self._columns]
+        since_value = datetime.fromtimestamp(since, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT {", ".join(columns)} FROM "{self.table}" WHERE created_at >= ? ORDER BY id',
+                (since_value,)
+            ).fetchall()
+        for row in rows:
+            article = dict(zip(columns, row))
+            article['added_at'] = _storage_timestamp(article.get('created_at'))
+            yield article
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JsonlStorage:
+    """Хранилище статей в файле JSON Lines (одна статья на строку)
+    
+    URL уже записанных статей читаются из файла при первой записи. Как и в
+    таблицах, к строке добавляется время записи created_at (ISO 8601, UTC).
+    """
+
+    def __init__(self, path='articles.jsonl'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._urls = None
+
+    def _load_urls(self):
+        urls = set()
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        urls.add(json.loads(line)['url'])
+                    except (ValueError, KeyError, TypeError):
+                        # Недописанная строка после аварийного завершения
+                        continue
+        return urls
+
+    def insert_batch(self, articles):
+        with self._lock:
+            if self._urls is None:
+                self._urls = self._load_urls()
+            inserted = []
+            for article in articles:
+                if article['url'] not in self._urls:
+                    self._urls.add(article['url'])
+                    inserted.append(article)
+            if inserted:
+                created_at = datetime.now(timezone.utc).isoformat()
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for article in inserted:
+                        f.write(json.dumps(dict(article, created_at=created_at), ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+            return inserted
+
+    def iter_urls(self, page_size=1000):
+        with self._lock:
+            if self._urls is None:
+                self._urls = self._load_urls()
+            urls = list(self._urls)
+        yield from urls
+
+    def iter_recent(self, since, page_size=1000):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    article = json.loads(line)
+                except ValueError:
+                    continue
+                # У строк, записанных до появления created_at, время неизвестно
+                added_at = _storage_timestamp(article.get('created_at'))
+                if added_at is not None and added_at >= since:
+                    yield dict(article, added_at=added_at)
+
+    def close(self):
+        pass
+
+# Коды ошибок Postgres/PostgREST, при которых хранилище отклоняет сами данные:
+# классы 22 (некорректное значение) и 23 (нарушение ограничения), неизвестная
+# колонка, несовпадение типа, некорректное тело запроса
+_DATA_ERROR_CLASSES = ('22', '23')
+_DATA_ERROR_CODES = {'42703', '42804', 'PGRST102', 'PGRST204'}
+
+def _is_data_error(error):
+    """Отклонило ли хранилище записываемые данные (повтор того же пакета не поможет)
+    
+    Остальные ошибки (сеть, таймауты, ответы 5xx, блокировка базы) считаются
+    недоступностью хранилища.
+    """
+    if isinstance(error, json.JSONDecodeError):
+        # Неразборчивый ответ сервера (например, страница ошибки прокси)
+        return False
+    if isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError,
+                          ValueError, TypeError)):
+        return True
+    code = str(getattr(error, 'code', '') or '')
+    return code[:2] in _DATA_ERROR_CLASSES or code in _DATA_ERROR_CODES
+
+class WriteBehindBuffer:
+    """Отложенная запись статей в хранилище в фоновом потоке
+    
+    put() только ставит статьи в очередь, поэтому загрузка и разбор фидов не ждут
+    хранилище. Пакеты, которые не удалось записать, дописываются в spill_path
+    (JSON Lines) и повторно отправляются после следующей успешной записи или при
+    следующем запуске. После ошибки хранилище не опрашивается retry_interval
+    секунд - новые пакеты сразу уходят на диск. Пакет, отклоненный хранилищем
+    из-за данных (см. _is_data_error), делится пополам до отдельных статей;
+    отклоненные статьи переносятся в rejected_path (по умолчанию
+    spill_path + '.rejected') и не задерживают остальные. Обработчик on_stored,
+    переданный в put(), вызывается из фонового потока, когда статьи записаны
+    в хранилище или в один из файлов; если не удалось ни то, ни другое,
+    он не вызывается.
+    """
+
+    def __init__(self, write_batch, spill_path='write_spill.jsonl', batch_size=100,
+                 retry_interval=60, logger=None, rejected_path=None):
+        # write_batch(articles) -> (добавлено, пропущено), при ошибке - исключение
+        self.write_batch = write_batch
+        self.spill_path = spill_path
+        self.rejected_path = rejected_path or (f"{spill_path}.rejected" if spill_path else None)
+        self.batch_size = max(1, int(batch_size))
+        self.retry_interval = retry_interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._retry_at = 0.0
+        self.inserted = 0
+        self.skipped = 0
+        self.spilled = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+
+    def put(self, articles, on_stored=None):
+        """Постановка статей в очередь записи"""
+        if articles:
+            self._ensure_started()
+            self._queue.put((list(articles), on_stored))
+        elif on_stored is not None:
+            on_stored()
+
+    def pending(self):
+        """Число пакетов, ожидающих записи"""
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """Ожидание записи (или сброса на диск) всех поставленных статей"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """Запись оставшихся статей и остановка фонового потока"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        # Статьи, оставшиеся на диске с прошлого запуска
+        try:
+            self._replay_spill()
+        except Exception as e:
+            self.logger.error(f"Ошибка повторной отправки статей из {self.spill_path}: {str(e)}")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            # Объединяем уже накопившиеся в очереди статьи в общие пакеты
+            articles, callback = item
+            articles, callbacks, taken, stop = list(articles), [callback], 1, False
+            while len(articles) < self.batch_size:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if extra is None:
+                    stop = True
+                    break
+                articles.extend(extra[0])
+                callbacks.append(extra[1])
+            try:
+                self._write(articles)
+                for callback in callbacks:
+                    if callback is not None:
+                        callback()
+            except Exception as e:
+                self.logger.error(f"Ошибка отложенной записи: {str(e)}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, articles):
+        for start in range(0, len(articles), self.batch_size):
+            batch = articles[start:start + self.batch_size]
+            unwritten = batch if time.monotonic() < self._retry_at else self._try_write(batch)
+            if unwritten:
+                self._spill(unwritten)
+            elif self.spill_path and os.path.exists(self.spill_path):
+                # Хранилище снова доступно - досылаем сохраненное на диск
+                try:
+                    self._replay_spill()
+                except Exception as e:
+                    self.logger.error(f"Ошибка повторной отправки статей из {self.spill_path}: {str(e)}")
+
+    def _try_write(self, batch):
+        """Запись пакета; возвращает статьи, не записанные из-за недоступности хранилища"""
+        try:
+            inserted, skipped = self.write_batch(batch)
+        except Exception as e:
+            if not _is_data_error(e):
+                self.logger.warning(f"Хранилище недоступно ({str(e)}), статьи сохраняются в {self.spill_path}")
+                self._retry_at = time.monotonic() + self.retry_interval
+                return batch
+            if len(batch) == 1:
+                self._reject(batch[0], e)
+                return []
+            # Ищем отклоненные статьи, записывая половины пакета по отдельности
+            middle = len(batch) // 2
+            unwritten = self._try_write(batch[:middle])
+            if unwritten:
+                return unwritten + batch[middle:]
+            return self._try_write(batch[middle:])
+        self.inserted += inserted
+        self.skipped += skipped
+        return []
+
+    def _reject(self, article, error):
+        """Перенос статьи, которую хранилище не принимает, в rejected_path"""
+        self.logger.error(f"Хранилище отклонило статью {article.get('url')} ({str(error)}), "
+                          f"она сохраняется в {self.rejected_path}")
+        if not self.rejected_path:
+            raise RuntimeError(f"хранилище отклонило статью {article.get('url')}, rejected_path не задан")
+        with open(self.rejected_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected += 1
+
+    def _spill(self, batch):
+        """Дозапись пакета на диск до восстановления хранилища"""
+        if not self.spill_path:
+            raise RuntimeError(f"хранилище недоступно, spill_path не задан - {len(batch)} статей не записано")
+        with open(self.spill_path, 'a', encoding='utf-8') as f:
+            for article in batch:
+                f.write(json.dumps(article, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    def _replay_spill(self):
+        """Повторная отправка статей из spill_path"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        articles = []
+        with open(self.spill_path, 'rb') as f:
+            for line in f:
+                try:
+                    articles.append(json.loads(line.decode('utf-8')))
+                except ValueError:
+                    # Недописанная строка после аварийного завершения
+                    continue
+        self.logger.info(f"Повторная отправка {len(articles)} статей из {self.spill_path}")
+        
+        for start in range(0, len(articles), self.batch_size):
+            unwritten = self._try_write(articles[start:start + self.batch_size])
+            if unwritten:
+                # Переписываем файл оставшимися статьями и ждем следующей попытки
+                tmp_path = f"{self.spill_path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for article in unwritten + articles[start + self.batch_size:]:
+                        f.write(json.dumps(article, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.spill_path)
+                return
+        os.remove(self.spill_path)
+
+class WorkQueue:
+    """Надежная локальная очередь заданий этапов обработки в SQLite
+    
+    Задание выдается обработчику с арендой (lease), после обработки подтверждается
+    (ack) или возвращается с паузой (retry), растущей экспоненциально с числом попыток.
+    Задания, не подтвержденные из-за аварийного завершения, при следующем открытии
+    очереди снова становятся доступны. После max_attempts неудачных попыток задание
+    помечается как failed и больше не выдается. Очередь рассчитана на один процесс.
+    """
+
+    def __init__(self, path='work_queue.db', max_attempts=8, retry_base=30, retry_max=3600,
+                 logger=None):
+        self.path = path
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                stage TEXT NOT NULL,
+                key TEXT,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                leased INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                UNIQUE (stage, key)
+            )
+        """)
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_stage ON jobs (stage, failed, available_at)')
+        # Задания, выданные до аварийного завершения прошлого запуска
+        with self._conn:
+            recovered = self._conn.execute('UPDATE jobs SET leased = 0 WHERE leased = 1').rowcount
+        if recovered:
+            self.logger.warning(f"Очередь {path}: возвращено {recovered} незавершенных заданий прошлого запуска")
+
+    def put(self, stage, payload, key=None, delay=0):
+        """Постановка задания; задание с тем же ключом этапа повторно не добавляется"""
+        with self._lock, self._conn:
+            self._insert(stage, payload, key, delay)
+
+    def _insert(self, stage, payload, key, delay):
+        self._conn.execute(
+            'INSERT OR IGNORE INTO jobs (stage, key, payload, available_at) VALUES (?, ?, ?, ?)',
+            (stage, key, json.dumps(payload, ensure_ascii=False), time.time() + delay)
         )
+
+    def lease(self, stage, limit=None):
+        """Выдача доступных заданий этапа: список (id задания, данные, номер попытки)"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                'SELECT id, payload, attempts FROM jobs '
+                'WHERE stage = ? AND failed = 0 AND leased = 0 AND available_at <= ? ORDER BY id LIMIT ?',
+                (stage, time.time(), -1 if limit is None else int(limit))
+            ).fetchall()
+            self._conn.executemany('UPDATE jobs SET leased = 1, attempts = attempts + 1 WHERE id = ?',
+                                   [(job_id,) for job_id, _, _ in rows])
+        return [(job_id, json.loads(payload), attempts + 1) for job_id, payload, attempts in rows]
+
+    def ack(self, job_id, next_stage=None, payload=None, key=None):
+        """Подтверждение задания; с next_stage - в той же транзакции ставится задание следующего этапа"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            if next_stage is not None:
+                self._insert(next_stage, payload, key, 0)
+
+    def retry(self, job_id, error):
+        """Возврат задания в очередь с паузой; возвращает False, если попытки исчерпаны"""
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT attempts FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return False
+            attempts = row[0]
+            if attempts >= self.max_attempts:
+                self._conn.execute('UPDATE jobs SET leased = 0, failed = 1, last_error = ? WHERE id = ?',
+                                   (str(error), job_id))
+                return False
+            delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max)
+            self._conn.execute('UPDATE jobs SET leased = 0, available_at = ?, last_error = ? WHERE id = ?',
+                               (time.time() + delay, str(error), job_id))
+            return True
+
+    def pending(self, stage):
+        """Число заданий этапа, ожидающих обработки (включая ожидающие повтора)"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE stage = ? AND failed = 0',
+                                      (stage,)).fetchone()[0]
+
+    def failed(self, stage):
+        """Число заданий этапа, исчерпавших попытки"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM jobs WHERE stage = ? AND failed = 1',
+                                      (stage,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+STORAGE_BACKENDS = {
+    'sqlite': (SQLiteStorage, 'articles.db'),
+    'jsonl': (JsonlStorage, 'articles.jsonl'),
+}
+
+# Экземпляр парсера в дочернем процессе пула (см. ArticleParser.process_articles)
+_worker_parser = None
+
+def _init_process_worker(parser):
+    """Инициализация дочернего процесса: парсер передается один раз на процесс"""
+    global _worker_parser
+    _worker_parser = parser
+
+def _parse_in_process(blogs):
+    """Загрузка и парсинг фидов одного хоста в дочернем процессе
+    
+    Ограничения на хост (per_host_limit, host_delay) действуют только внутри
+    процесса, поэтому все фиды хоста обрабатываются одним заданием - не больше
+    per_host_limit одновременно. Для каждого фида возвращает статьи, тип ошибки
+    фида (или None), несохраненные валидаторы и отметку фида, а также текст
+    исключения (failed), если обработка фида прервалась - такой фид повторяет
+    родительский процесс. Счетчики кэша и метрики возвращаются общие для задания,
+    чтобы родительский процесс мог объединить их со своими.
+    """
+    parser = _worker_parser
+    cache = parser.feed_cache
+    if cache is not None:
+        cache.reset_stats()
+    parser.metrics.start_cycle()
+    parser.feed_errors = {}
+    
+    def parse(blog):
+        try:
+            articles, pending = parser._fetch_feed_articles(blog)
+        except Exception as e:
+            return {'articles': [], 'pending': None, 'failed': f"{type(e).__name__}: {str(e)}"}
+        return {'articles': articles, 'pending': pending, 'failed': None}
+        
+    workers = min(parser.per_host_limit, len(blogs))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            feeds = list(executor.map(parse, blogs))
+    else:
+        feeds = [parse(blog) for blog in blogs]
+    for blog, feed in zip(blogs, feeds):
+        feed['error'] = parser.feed_errors.get(blog['url'])
+    
+    return {
+        'feeds': feeds,
+        'hits': cache.hits if cache is not None else 0,
+        'misses': cache.misses if cache is not None else 0,
+        'metrics': parser.metrics.cycle_snapshot(),
+    }
+
+class ArticleParser:
+    def __init__(self, max_workers=8, per_host_limit=2, host_delay=2.0, cache_path='feed_cache.json',
+                 batch_size=100, seen_index_path='seen_urls.idx', seen_index_capacity=2000000,
+                 processes=0, shard_index=0, shard_count=1, metrics_port=None,
+                 metrics_path='cycle_metrics.json', http2=False, dns_cache_ttl=None,
+                 lazy=True, schema_check='cached', schema_marker_path='.schema_verified',
+                 supabase_client=None, storage='supabase', storage_path=None, write_behind=False,
+                 spill_path='write_spill.jsonl', known_streak=3, mark_grace_hours=24, mark_size=500,
+                 fetch_content=False, content_workers=4, content_host_delay=1.0,
+                 content_max_bytes=2 * 1024 * 1024, content_cache_dir='content_cache',
+                 near_duplicates=False, near_duplicate_window_hours=72, near_duplicate_distance=3,
+                 sources_path=None, max_feed_bytes=20 * 1024 * 1024, stream_parse_bytes=4 * 1024 * 1024,
+                 queue_path=None, queue_max_attempts=8, state_save_interval=300):
+        init_started = time.perf_counter()
+        
+        # Настройка логирования
+        self._setup_logging()
         self.logger = logging.getLogger(__name__)
         
-        # Загрузка конфигурации
-        supabase_url, supabase_key = self._load_config()
-        if not supabase_url or not supabase_key:
-            self.logger.error("Не удалось загрузить конфигурацию Supabase")
-            sys.exit(1)
-            
-        # Инициализация Supabase клиента
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        # Подключение к Supabase: при lazy=True - при первом обращении к базе.
+        # schema_check: 'always' - проверять таблицу при каждом подключении,
+        # 'cached' - один раз (результат запоминается в schema_marker_path), 'skip' - не проверять
+        self.schema_check = schema_check
+        self.schema_marker_path = schema_marker_path
+        self._supabase = supabase_client
+        self._supabase_lock = threading.Lock()
         
-        # Проверка и создание таблицы Links_articles, если она не существует
-        self._ensure_table_exists()
+        # Хранилище статей: 'supabase', 'sqlite', 'jsonl' или готовый объект хранилища
+        if isinstance(storage, str):
+            if storage == 'supabase':
+                self.storage = SupabaseStorage(lambda: self.supabase)
+            elif storage in STORAGE_BACKENDS:
+                storage_class, default_path = STORAGE_BACKENDS[storage]
+                self.storage = storage_class(storage_path or default_path)
+            else:
+                raise ValueError(f"Неизвестное хранилище: {storage}")
+        else:
+            self.storage = storage
+        if self._supabase is None and isinstance(self.storage, SupabaseStorage):
+            # Конфигурация проверяется сразу (без обращения к сети), чтобы без нее
+            # не выполнять цикл, все записи которого заведомо не удадутся
+            supabase_url, supabase_key = self._load_config()
+            if not supabase_url or not supabase_key:
+                self.logger.error("Не удалось загрузить конфигурацию Supabase")
+                sys.exit(1)
+            if not lazy:
+                try:
+                    self._supabase = self._connect_supabase()
+                except RuntimeError:
+                    sys.exit(1)
         
         # Настройка запросов с ротацией User-Agent
         self.user_agents = [
@@ -52,6 +1816,117 @@ class ArticleParser:
             'Accept-Language': 'en-US,en;q=0.5',
         }
         
+        # Параметры параллельной загрузки фидов:
+        # max_workers - глобальное ограничение числа одновременных загрузок,
+        # per_host_limit - число одновременных запросов к одному хосту,
+        # host_delay - минимальная пауза между запросами к одному хосту (секунды)
+        self.max_workers = max(1, int(max_workers))
+        # Общий лимит одновременных загрузок с учетом веса (weight) источников
+        self._feed_slots = WeightedSemaphore(self.max_workers)
+        self.per_host_limit = max(1, int(per_host_limit))
+        self.host_delay = max(0.0, float(host_delay))
+        self._hosts_lock = threading.Lock()
+        self._host_semaphores = {}
+        self._host_last_request = {}
+        
+        # Общий HTTP-клиент с пулом соединений (создается при первом запросе):
+        # http2=True - клиент httpx с HTTP/2, если установлен httpx[http2]
+        self.http2 = http2
+        self._http_client = None
+        self._http_client_lock = threading.Lock()
+        self._connection_stats = {'requests': 0, 'new_connections': 0}
+        # Кэш DNS (dns_cache_ttl секунд) подменяет socket.getaddrinfo во всем процессе,
+        # поэтому включается только явно и снимается в close()
+        self.dns_cache = DnsCache.install(dns_cache_ttl) if dns_cache_ttl else None
+        
+        # Многопроцессный режим: processes - число процессов парсинга (0 или 1 - без пула),
+        # shard_index / shard_count - доля источников, которую обрабатывает этот узел
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f"Некорректный шард {shard_index} из {shard_count}")
+        self.processes = max(0, int(processes))
+        self.shard_index = int(shard_index)
+        self.shard_count = int(shard_count)
+        
+        # Ошибки фидов в текущем цикле: URL фида -> тип ошибки
+        self.feed_errors = {}
+        
+        # Метрики: эндпоинт /metrics (если задан порт) и JSON-сводка по каждому циклу
+        self.metrics = ParserMetrics()
+        self.metrics_path = metrics_path
+        self.metrics_server = None
+        if metrics_port:
+            try:
+                self.metrics_server = self.metrics.start_http_server(int(metrics_port))
+                self.logger.info(f"Метрики доступны на http://127.0.0.1:{metrics_port}/metrics")
+            except Exception as e:
+                self.logger.error(f"Не удалось запустить сервер метрик: {str(e)}")
+        
+        # Размер пакета при массовой записи статей в хранилище
+        self.batch_size = max(1, int(batch_size))
+        
+        # Отложенная запись: статьи пишутся в фоновом потоке, при недоступности
+        # хранилища - сохраняются в spill_path до восстановления
+        self.write_buffer = None
+        if write_behind:
+            self.write_buffer = WriteBehindBuffer(self._write_batch_async, spill_path,
+                                                  self.batch_size, logger=self.logger)
+        
+        # Надежная очередь этапов (загрузка и разбор фида -> запись статей) в queue_path:
+        # после аварийного завершения обработка продолжается с незавершенных заданий,
+        # неудачная запись повторяется с растущей паузой (не более queue_max_attempts попыток)
+        self.work_queue = None
+        self._feed_jobs = {}
+        if queue_path:
+            self.work_queue = WorkQueue(queue_path, queue_max_attempts, logger=self.logger)
+            if self.write_buffer is not None:
+                self.logger.warning("Отложенная запись не используется вместе с очередью заданий")
+                self.write_buffer = None
+        
+        # Загрузка полного текста новых статей (колонка content): не более content_workers
+        # загрузок одновременно, пауза content_host_delay между запросами к одному сайту,
+        # страницы читаются не более чем на content_max_bytes и кэшируются в content_cache_dir
+        self.fetch_content = fetch_content
+        self.content_workers = max(1, int(content_workers))
+        self.content_host_delay = content_host_delay
+        self.content_max_bytes = content_max_bytes
+        self.content_cache = ContentCache(content_cache_dir) if content_cache_dir else None
+        self._content_executor = None
+        self._content_executor_lock = threading.Lock()
+        self._content_stage = None
+        self._content_stage_tasks = []
+        
+        # Поиск почти одинаковых статей (перепечатки одной новости разными источниками):
+        # такие статьи сохраняются со статусом 'duplicate' и ссылкой duplicate_of
+        # на первую статью кластера. В первом цикле индекс заполняется статьями
+        # хранилища за окно, чтобы перепечатки находились и между запусками
+        self.near_duplicates = None
+        self._near_duplicates_warm = False
+        if near_duplicates:
+            self.near_duplicates = NearDuplicateIndex(near_duplicate_window_hours, near_duplicate_distance)
+        
+        # Ограничение памяти на фид: загрузка прерывается, если тело ответа больше
+        # max_feed_bytes; фиды больше stream_parse_bytes не собираются в памяти
+        # целиком, а разбираются потоковым парсером по мере загрузки
+        self.max_feed_bytes = max_feed_bytes
+        self.stream_parse_bytes = min(stream_parse_bytes, max_feed_bytes)
+        
+        # Инкрементальная обработка: разбор фида прекращается после known_streak подряд
+        # записей, уже обработанных в прошлых опросах; записи старее самой новой
+        # известной более чем на mark_grace_hours пропускаются. В отметке хранится
+        # до mark_size последних записей фида
+        self.known_streak = max(1, int(known_streak))
+        self.mark_grace = mark_grace_hours * 3600
+        self.mark_size = mark_size
+        
+        # Кэш ETag / Last-Modified и отметок фидов для условных запросов (None - без кэша)
+        self.feed_cache = None
+        if cache_path:
+            self.feed_cache = FeedCache(cache_path)
+            try:
+                self.feed_cache.load()
+            except Exception as e:
+                self.logger.error(f"Ошибка загрузки кэша фидов: {str(e)}")
+        
         # Расширенный список источников для парсинга
         self.blogs = [
             {
@@ -99,20 +1974,164 @@ class ArticleParser:
             }
         ]
 
-        # Расширенный список ключевых слов для ИИ
-        self.ai_keywords = [
-            'artificial intelligence', 'ai', 'machine learning', 'ml',
-            'neural network', 'deep learning', 'gpt', 'llm', 
-            'chatbot', 'robotics', 'computer vision', 'nlp',
-            'natural language processing', 'transformers', 'large language model',
-            'reinforcement learning', 'autonomous systems', 'ai ethics',
-            'artificial general intelligence', 'agi', 'machine intelligence',
-            'neural networks', 'deep neural networks', 'ai model',
-            'language model', 'ai research', 'ai development',
-            'ai applications', 'ai technology', 'ai solutions',
-            'ai tools', 'ai software', 'ai platform',
-            'ai startup', 'ai company', 'ai industry'
-        ]
+        # Расширенный список ключевых слов для ИИ
+        self.ai_keywords = [
+            'artificial intelligence', 'ai', 'machine learning', 'ml',
+            'neural network', 'deep learning', 'gpt', 'llm', 'openai', 'chatgpt', 'genai',
+            'chatbot', 'robotics', 'computer vision', 'nlp',
+            'natural language processing', 'transformers', 'large language model',
+            'reinforcement learning', 'autonomous systems', 'ai ethics',
+            'artificial general intelligence', 'agi', 'machine intelligence',
+            'neural networks', 'deep neural networks', 'ai model',
+            'language model', 'ai research', 'ai development',
+            'ai applications', 'ai technology', 'ai solutions',
+            'ai tools', 'ai software', 'ai platform',
+            'ai startup', 'ai company', 'ai industry'
+        ]
+        self.ai_matcher = KeywordMatcher(self.ai_keywords)
+        # Фильтры по категориям источников: записи фида категории с набором
+        # ключевых слов сохраняются, только если содержат одно из них
+        self.keyword_matchers = {'AI': self.ai_matcher}
+        
+        # Источники и ключевые слова из файла (заменяют встроенные списки);
+        # в периодическом режиме изменения файла применяются без перезапуска
+        self.source_registry = None
+        if sources_path:
+            self.source_registry = SourceRegistry(sources_path)
+            self._apply_sources(*self.source_registry.load())
+        
+        # Локальный индекс уже сохраненных URL (None - без индекса);
+        # при lazy=True загружается при первой проверке статей
+        self.seen_index_path = seen_index_path
+        self.seen_index_capacity = seen_index_capacity
+        self._seen_index = None
+        self._seen_index_lock = threading.Lock()
+        if not lazy and seen_index_path:
+            self._seen_index = self._init_seen_index(seen_index_capacity)
+            
+        # В периодическом режиме кэш фидов, индекс URL и сводка метрик сохраняются
+        # не после каждой пачки фидов, а не чаще раза в state_save_interval секунд
+        self.state_save_interval = state_save_interval
+            
+        self.logger.info(f"Холодный старт: импорт модуля {_IMPORT_SECONDS * 1000:.0f} мс, "
+                         f"инициализация парсера {(time.perf_counter() - init_started) * 1000:.0f} мс")
+
+    @property
+    def supabase(self):
+        """Клиент Supabase (подключение при первом обращении)"""
+        if self._supabase is None:
+            with self._supabase_lock:
+                if self._supabase is None:
+                    self._supabase = self._connect_supabase()
+        return self._supabase
+
+    @supabase.setter
+    def supabase(self, client):
+        self._supabase = client
+
+    @property
+    def seen_index(self):
+        """Индекс сохраненных URL (загрузка при первом обращении)"""
+        if self._seen_index is None and self.seen_index_path:
+            with self._seen_index_lock:
+                if self._seen_index is None:
+                    self._seen_index = self._init_seen_index(self.seen_index_capacity)
+        return self._seen_index
+
+    def _connect_supabase(self):
+        """Создание клиента Supabase и проверка таблицы"""
+        started = time.perf_counter()
+        supabase_url, supabase_key = self._load_config()
+        if not supabase_url or not supabase_key:
+            self.logger.error("Не удалось загрузить конфигурацию Supabase")
+            raise RuntimeError("Не удалось загрузить конфигурацию Supabase")
+            
+        # Инициализация Supabase клиента
+        from supabase import create_client
+        client = create_client(supabase_url, supabase_key)
+        
+        # Проверка и создание таблицы Links_articles, если она не существует
+        if self.schema_check == 'always' or (self.schema_check == 'cached' and not self._schema_verified(supabase_url)):
+            # Отметка пишется только после успешной проверки или создания таблицы
+            if self._ensure_table_exists(client):
+                self._mark_schema_verified(supabase_url)
+            
+        self.logger.info(f"Подключение к Supabase за {(time.perf_counter() - started) * 1000:.0f} мс")
+        return client
+
+    def _schema_verified(self, supabase_url):
+        """Была ли таблица уже проверена для этого проекта Supabase"""
+        if not self.schema_marker_path:
+            return False
+        try:
+            with open(self.schema_marker_path, 'r') as f:
+                return supabase_url in json.load(f)
+        except Exception:
+            return False
+
+    def _mark_schema_verified(self, supabase_url):
+        """Запоминание успешной проверки таблицы"""
+        if not self.schema_marker_path:
+            return
+        try:
+            verified = {}
+            if os.path.exists(self.schema_marker_path):
+                with open(self.schema_marker_path, 'r') as f:
+                    verified = json.load(f)
+            verified[supabase_url] = datetime.now().isoformat()
+            with open(self.schema_marker_path, 'w') as f:
+                json.dump(verified, f, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Не удалось сохранить отметку о проверке таблицы: {str(e)}")
+
+    @staticmethod
+    def _setup_logging():
+        """Настройка логирования (повторные вызовы ничего не меняют)"""
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('parser.log'),
+                logging.StreamHandler()
+            ]
+        )
+
+    def __getstate__(self):
+        """Состояние для передачи в дочерний процесс: без клиента базы, блокировок и индекса URL"""
+        state = self.__dict__.copy()
+        for key in ('_supabase', '_supabase_lock', 'storage', 'write_buffer', 'work_queue', '_content_executor',
+                    '_content_executor_lock', '_content_stage', '_content_stage_tasks', 'near_duplicates', '_feed_slots', '_seen_index',
+                    '_seen_index_lock', 'metrics_server', '_hosts_lock', '_host_semaphores', '_host_last_request', '_http_client',
+                    '_http_client_lock', 'dns_cache'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup_logging()
+        self._supabase = None
+        self._supabase_lock = threading.Lock()
+        # Дочерний процесс только парсит фиды - индекс URL ему не нужен
+        self.seen_index_path = None
+        self._seen_index = None
+        self._seen_index_lock = threading.Lock()
+        self.storage = None
+        self.write_buffer = None
+        self.work_queue = None
+        self._content_executor = None
+        self._content_executor_lock = threading.Lock()
+        self._content_stage = None
+        self._content_stage_tasks = []
+        self.near_duplicates = None
+        self._feed_slots = WeightedSemaphore(self.max_workers)
+        self.metrics_server = None
+        self._hosts_lock = threading.Lock()
+        self._host_semaphores = {}
+        self._host_last_request = {}
+        self._http_client = None
+        self._http_client_lock = threading.Lock()
+        self._connection_stats = {'requests': 0, 'new_connections': 0}
+        self.dns_cache = DnsCache._installed
 
     def _load_config(self):
         """Безопасная загрузка конфигурации"""
@@ -138,13 +2157,17 @@ class ArticleParser:
         
         return supabase_url, supabase_key
 
-    def _ensure_table_exists(self):
-        """Проверка и создание таблицы Links_articles, если она не существует"""
+    def _ensure_table_exists(self, client):
+        """Проверка и создание таблицы Links_articles, если она не существует
+        
+        Возвращает True, если таблица существует или успешно создана.
+        """
         try:
             # Проверяем существование таблицы, выполняя простой запрос
             try:
-                self.supabase.table('Links_articles').select('id').limit(1).execute()
+                client.table('Links_articles').select('id').limit(1).execute()
                 self.logger.info("Таблица Links_articles уже существует")
+                return True
             except Exception as e:
                 self.logger.error(f"Ошибка при проверке таблицы: {str(e)}")
                 self.logger.info("Создание таблицы Links_articles...")
@@ -158,9 +2181,11 @@ class ArticleParser:
                     source TEXT NOT NULL,
                     category TEXT,
                     summary TEXT,
+                    content TEXT,
                     published_date TEXT,
                     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                    status TEXT DEFAULT 'new'
+                    status TEXT DEFAULT 'new',
+                    duplicate_of TEXT
                 );
                 
                 -- Создаем индексы для ускорения поиска
@@ -170,13 +2195,14 @@ class ArticleParser:
                 """
                 
                 # Выполняем SQL через Supabase
-                response = self.supabase.rpc('exec_sql', {'sql': sql}).execute()
+                response = client.rpc('exec_sql', {'sql': sql}).execute()
                 
                 if hasattr(response, 'error') and response.error:
                     self.logger.error(f"Ошибка создания таблицы: {response.error}")
                     self.logger.warning("Не удалось создать таблицу автоматически. Пожалуйста, создайте таблицу вручную через интерфейс Supabase.")
-                else:
-                    self.logger.info("Таблица Links_articles успешно создана")
+                    return False
+                self.logger.info("Таблица Links_articles успешно создана")
+                return True
         except Exception as e:
             self.logger.error(f"Ошибка при проверке/создании таблицы: {str(e)}")
             self.logger.warning("Пожалуйста, создайте таблицу вручную через интерфейс Supabase со следующей структурой:")
@@ -188,53 +2214,492 @@ class ArticleParser:
                 source TEXT NOT NULL,
                 category TEXT,
                 summary TEXT,
+                content TEXT,
                 published_date TEXT,
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                status TEXT DEFAULT 'new'
+                status TEXT DEFAULT 'new',
+                duplicate_of TEXT
             );
             CREATE INDEX idx_links_articles_url ON "Links_articles" (url);
             """)
+            return False
+
+    def _init_seen_index(self, capacity):
+        """Загрузка индекса просмотренных URL с диска или прогрев из таблицы"""
+        path = Path(self.seen_index_path)
+        if path.exists():
+            try:
+                index = SeenUrlIndex.load(path, capacity)
+                if index is not None and index.complete:
+                    self.logger.info(f"Индекс URL загружен: {index.count} записей")
+                    return index
+                self.logger.warning("Индекс URL неполон или его параметры изменились, индекс будет построен заново")
+            except Exception as e:
+                self.logger.error(f"Ошибка загрузки индекса URL: {str(e)}")
+                
+        index = SeenUrlIndex(capacity)
+        self._warm_seen_index(index)
+        return index
+
+    def _warm_seen_index(self, index, page_size=1000):
+        """Заполнение индекса URL из хранилища статей
+        
+        Если заполнение прервано ошибкой, индекс помечается неполным: он
+        используется в этом запуске, но не сохраняется на диск и заполняется
+        заново в следующем цикле.
+        """
+        index.complete = False
+        try:
+            for url in self.storage.iter_urls(page_size):
+                index.add(url)
+            index.complete = True
+            self.logger.info(f"Индекс URL построен по хранилищу: {index.count} записей")
+        except Exception as e:
+            self.logger.error(f"Ошибка построения индекса URL: {str(e)}")
+
+    def _save_seen_index(self):
+        """Сохранение индекса URL на диск (если он был загружен в этом запуске)"""
+        if self._seen_index is None:
+            return
+        if not self._seen_index.complete:
+            self.logger.warning("Индекс URL построен не полностью и не сохраняется")
+            return
+        if not self._seen_index.dirty:
+            return
+        try:
+            self.seen_index.save(self.seen_index_path)
+            if self.seen_index.saturated:
+                self.logger.warning(f"Индекс URL переполнен ({self.seen_index.count} из "
+                                    f"{self.seen_index.capacity}), увеличьте seen_index_capacity")
+        except Exception as e:
+            self.logger.error(f"Ошибка сохранения индекса URL: {str(e)}")
 
     def _get_random_user_agent(self):
         """Получение случайного User-Agent"""
         return random.choice(self.user_agents)
+
+    def _get_host_semaphore(self, host):
+        """Получение семафора, ограничивающего число запросов к одному хосту"""
+        with self._hosts_lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _wait_host_delay(self, host, delay=None):
+        """Соблюдение паузы между запросами к одному хосту (по умолчанию host_delay)"""
+        delay = self.host_delay if delay is None else delay
+        with self._hosts_lock:
+            now = time.monotonic()
+            # Резервируем ближайший допустимый момент запроса к хосту
+            scheduled = max(now, self._host_last_request.get(host, 0.0) + delay)
+            self._host_last_request[host] = scheduled
+
+        wait = scheduled - now
+        if wait > 0:
+            time.sleep(wait)
+
+    @contextmanager
+    def _http_stream(self, url, headers, timeout=20, conditional=False, host_delay=None):
+        """Потоковый HTTP-запрос с учетом ограничений на хост и паузы между запросами
         
-    def is_ai_related(self, entry):
-        """Проверка, относится ли статья к тематике ИИ по ключевым словам"""
-        if not entry:
-            return False
+        Тело ответа не загружается заранее, его читают по частям через _iter_body;
+        ограничение числа запросов к хосту действует, пока ответ читается.
+        При conditional=True добавляются заголовки If-None-Match / If-Modified-Since
+        из кэша фидов, а ответ 304 учитывается как попадание в кэш.
+        """
+        host = urlparse(url).netloc.lower()
+        use_cache = conditional and self.feed_cache is not None
+        if use_cache:
+            headers = {**headers, **self.feed_cache.conditional_headers(url)}
+
+        client = self._get_http_client()
+        with self._get_host_semaphore(host):
+            self._wait_host_delay(host, host_delay)
+            if self.http2:
+                stream = client.stream('GET', url, headers=headers, timeout=timeout,
+                                       extensions={'trace': self._trace_http2_connection})
+            else:
+                stream = client.get(url, headers=headers, timeout=timeout, stream=True)
+            with self._http_client_lock:
+                self._connection_stats['requests'] += 1
+                
+            with stream as response:
+                if use_cache:
+                    self.feed_cache.record(response.status_code == 304)
+                yield response
+                # Непрочитанный ответ без тела (304, 204) дочитываем, чтобы соединение
+                # вернулось в пул; полностью прочитанное тело возвращает его само.
+                # При прерывании на середине тела (исключение или досрочная остановка)
+                # соединение закрывается при выходе из with
+                if response.status_code in (204, 304):
+                    self._drain_response(response)
+
+    def _drain_response(self, response, max_bytes=65536):
+        """Дочитывание короткого остатка ответа для возврата соединения в пул"""
+        try:
+            received = 0
+            for chunk in self._iter_body(response):
+                received += len(chunk)
+                if received > max_bytes:
+                    break
+        except Exception:
+            pass
+
+    def _iter_body(self, response, chunk_size=65536):
+        """Части тела ответа (после распаковки gzip/br)"""
+        return response.iter_bytes(chunk_size) if self.http2 else response.iter_content(chunk_size)
+
+    def _download(self, url, headers, max_bytes, timeout=20, host_delay=None):
+        """Потоковая загрузка с ограничением размера тела ответа
+        
+        Читается не более max_bytes байт (после распаковки), остаток ответа
+        не загружается. Возвращает кортеж (ответ, тело, обрезано ли тело).
+        """
+        chunks = []
+        size = 0
+        truncated = False
+        with self._http_stream(url, headers, timeout=timeout, host_delay=host_delay) as response:
+            for chunk in self._iter_body(response):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_bytes:
+                    truncated = True
+                    break
+        return response, b''.join(chunks)[:max_bytes], truncated
+
+    def _count_new_connection(self):
+        """Учет нового (не переиспользованного) соединения"""
+        with self._http_client_lock:
+            self._connection_stats['new_connections'] += 1
+
+    def _trace_http2_connection(self, event_name, info):
+        """Трассировка httpx: учет установления новых TCP-соединений"""
+        if event_name == 'connection.connect_tcp.complete':
+            self._count_new_connection()
+
+    def _get_http_client(self):
+        """Общий HTTP-клиент с пулом keep-alive соединений по хостам"""
+        if self._http_client is not None:
+            return self._http_client
+            
+        with self._http_client_lock:
+            if self._http_client is not None:
+                return self._http_client
+                
+            if self.http2:
+                try:
+                    import httpx
+                    import h2  # noqa: F401
+                    self._http_client = httpx.Client(
+                        http2=True,
+                        follow_redirects=True,
+                        headers={'Accept-Encoding': _accept_encoding()},
+                        limits=httpx.Limits(max_connections=self.max_workers * self.per_host_limit,
+                                            max_keepalive_connections=self.max_workers * self.per_host_limit),
+                    )
+                    return self._http_client
+                except ImportError:
+                    self.logger.warning("Для HTTP/2 требуется пакет httpx[http2], используется HTTP/1.1")
+                    self.http2 = False
+                    
+            import requests
+            session = requests.Session()
+            session.headers['Accept-Encoding'] = _accept_encoding()
+            # Пул на каждый хост рассчитан на per_host_limit одновременных запросов
+            adapter = _counting_http_adapter(self._count_new_connection, pool_connections=256,
+                                             pool_maxsize=self.per_host_limit, pool_block=False)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._http_client = session
+            return self._http_client
+
+    def connection_stats(self):
+        """Статистика переиспользования соединений с момента создания парсера"""
+        with self._http_client_lock:
+            stats = dict(self._connection_stats)
+        stats['reused'] = max(0, stats['requests'] - stats['new_connections'])
+        if self.dns_cache is not None:
+            stats['dns_hits'] = self.dns_cache.hits
+            stats['dns_misses'] = self.dns_cache.misses
+        return stats
+
+    @contextmanager
+    def _open_feed(self, blog_config, headers):
+        """Условная потоковая загрузка фида: (ответ, итератор частей тела)"""
+        with self._http_stream(blog_config['url'], headers, timeout=blog_config.get('timeout', 20),
+                               conditional=True) as response:
+            if response.status_code == 304:
+                self.metrics.inc('feeds_not_modified_total')
+            yield response, self._iter_feed_chunks(response, blog_config)
+
+    def _iter_feed_chunks(self, response, blog_config):
+        """Части тела фида; загрузка прерывается, как только размер превышает max_feed_bytes"""
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > self.max_feed_bytes:
+            raise FeedTooLargeError(f"Размер фида {length} байт больше допустимых {self.max_feed_bytes}")
             
-        # Проверяем заголовок
-        title = entry.get('title', '').lower()
+        received = 0
+        for chunk in self._iter_body(response):
+            received += len(chunk)
+            if received > self.max_feed_bytes:
+                raise FeedTooLargeError(f"Фид больше допустимых {self.max_feed_bytes} байт, загрузка прервана")
+            yield chunk
+        self.metrics.observe('response_bytes', received, feed=blog_config['name'])
+
+    def _read_feed(self, chunks):
+        """Чтение тела фида в память, если оно не больше stream_parse_bytes
         
-        # Проверяем описание/содержимое
-        description = entry.get('description', '').lower()
-        summary = entry.get('summary', '').lower()
-        content = ''
+        Возвращает (тело, True) или (уже прочитанные части, False) - тогда
+        оставшиеся части читаются из того же итератора при потоковом разборе.
+        """
+        parts = []
+        size = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            size += len(chunk)
+            if size > self.stream_parse_bytes:
+                return parts, False
+        return b''.join(parts), True
+
+    def _store_validators(self, pending, response):
+        """Валидаторы успешно обработанного фида (сохраняются после записи его статей)"""
+        if self.feed_cache is not None:
+            pending.update(FeedCache.validators(response.headers))
+
+    def _commit_feed_state(self, url, pending):
+        """Сохранение валидаторов и отметки опроса фида, статьи которого записаны в хранилище"""
+        if self.feed_cache is not None and pending:
+            self.feed_cache.update(url, pending)
+
+    def _entry_texts(self, entry):
+        """Тексты записи фида, по которым определяется тематика"""
+        texts = [entry.get('title', ''), entry.get('description', ''), entry.get('summary', '')]
         
         # Пытаемся получить содержимое из разных возможных структур RSS
         if 'content' in entry:
             try:
                 if isinstance(entry['content'], list):
-                    content = entry['content'][0].get('value', '').lower()
+                    texts.append(entry['content'][0].get('value', ''))
                 else:
-                    content = str(entry['content']).lower()
+                    texts.append(str(entry['content']))
             except:
                 pass
-                
-        # Объединяем все тексты для поиска
-        all_text = title + ' ' + description + ' ' + summary + ' ' + content
+        return texts
+
+    def is_ai_related(self, entry):
+        """Проверка, относится ли статья к тематике ИИ по ключевым словам"""
+        return self._matches_keywords(entry, self.ai_matcher)
+
+    def _matches_keywords(self, entry, matcher):
+        """Есть ли в записи хотя бы одно ключевое слово набора"""
+        if not entry or matcher is None:
+            return False
+            
+        # Поиск останавливается на первом найденном ключевом слове
+        return any(matcher.search(text) for text in self._entry_texts(entry))
+
+    def match_ai_keywords(self, entry):
+        """Множество ключевых слов ИИ, найденных в записи (для оценки релевантности)"""
+        if not entry:
+            return set()
+        found = set()
+        if self.ai_matcher is None:
+            return found
+        for text in self._entry_texts(entry):
+            found |= self.ai_matcher.find_all(text)
+        return found
+
+    def _is_feed_ok(self, feed):
+        """Проверка, что feedparser разобрал фид без критичных ошибок"""
+        import feedparser
+        if feed.bozo and not isinstance(feed.bozo_exception, (feedparser.ThingsNobodyCaresAboutButMe, TypeError)):
+            return False
+        return hasattr(feed, 'entries') and bool(feed.entries)
+
+    def _note_feed_error(self, blog_config, error):
+        """Отметка об ошибке загрузки или парсинга фида в текущем цикле"""
+        self.feed_errors[blog_config['url']] = type(error).__name__
+        self.metrics.inc('errors_total', type=type(error).__name__, stage='feed')
+
+    @staticmethod
+    def _entry_key(entry):
+        """Короткий ключ записи фида для отметки последнего опроса"""
+        key = entry.get('link') or entry.get('id') or entry.get('guid') or entry.get('title')
+        if not key:
+            return None
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _entry_timestamp(entry):
+        """Время публикации записи (Unix-время) или None"""
+        for field in ('published_parsed', 'updated_parsed'):
+            parsed = entry.get(field)
+            if parsed:
+                return calendar.timegm(parsed)
+        for field in ('published', 'updated'):
+            value = (entry.get(field) or '').strip()
+            if not value:
+                continue
+            try:
+                return parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError, IndexError):
+                pass
+            try:
+                parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                if parsed.tzinfo is None:
+                    return calendar.timegm(parsed.timetuple())
+                return parsed.timestamp()
+            except ValueError:
+                pass
+        return None
+
+    def _extract_articles(self, entries, blog_config, pending=None):
+        """Формирование статей из записей фида (feedparser или резервного парсера)
+        
+        Разбор прекращается, как только подряд встречаются known_streak записей
+        из отметки прошлого опроса, не новее ее времени, - но только пока даты
+        записей идут от новых к старым. В фидах, упорядоченных иначе или без дат,
+        новые записи могут стоять после известных, поэтому известные записи
+        (как и записи старее отметки) пропускаются по одной без фильтрации.
+        Новая отметка добавляется в pending и сохраняется вместе с валидаторами
+        фида после записи статей.
+        Возвращает кортеж (статьи, время фильтрации по ключевым словам в секундах).
+        """
+        articles = []
+        seen = filtered = known = 0
+        filter_time = 0.0
         
-        # Проверяем наличие ключевых слов
-        return any(keyword in all_text for keyword in self.ai_keywords)
+        url = blog_config['url']
+        marks = self.feed_cache.marks(url) if self.feed_cache is not None else {}
+        known_keys = set(marks.get('keys') or ())
+        newest = marks.get('newest')
+        new_keys = []
+        newest_seen = newest
+        streak = 0
+        descending = True
+        previous = None
+        matcher = self.keyword_matchers.get(blog_config.get('category'))
+        
+        for entry in entries:
+            key = self._entry_key(entry)
+            timestamp = self._entry_timestamp(entry)
+            if timestamp is not None:
+                if previous is not None and timestamp > previous:
+                    descending = False
+                previous = timestamp
+                
+            if key is not None and key in known_keys:
+                known += 1
+                if descending and timestamp is not None and newest is not None and timestamp <= newest:
+                    streak += 1
+                    if streak >= self.known_streak:
+                        break
+                else:
+                    streak = 0
+                continue
+            streak = 0
+            
+            if timestamp is not None:
+                if newest is not None and timestamp < newest - self.mark_grace:
+                    # Запись старее отметки прошлого опроса
+                    known += 1
+                    continue
+                # Даты из будущего не сдвигают отметку дальше текущего времени
+                timestamp = min(timestamp, time.time())
+                newest_seen = timestamp if newest_seen is None else max(newest_seen, timestamp)
+            if key is not None:
+                new_keys.append(key)
+                
+            seen += 1
+            
+            # Для категорий с набором ключевых слов (например, AI) проверяем тематику статьи
+            if matcher is not None:
+                filter_start = time.perf_counter()
+                is_related = self._matches_keywords(entry, matcher)
+                filter_time += time.perf_counter() - filter_start
+                if not is_related:
+                    filtered += 1
+                    continue
+                
+            # Формируем данные статьи
+            title = entry.get('title', '')
+            link = entry.get('link', '')
+            
+            # Проверка обязательных полей
+            if not title or not link:
+                continue
+                
+            # Получаем описание или содержимое
+            summary = entry.get('summary') or entry.get('description') or ''
+                
+            # Получаем дату публикации
+            published = entry.get('published', '')
+            if not published:
+                published = entry.get('updated', '')
+                
+            # Создаем запись статьи
+            article = {
+                'title': title,
+                'url': link,
+                'source': blog_config['name'],
+                'category': blog_config.get('category', ''),
+                'summary': summary,
+                'published_date': published
+            }
+            
+            articles.append(article)
+            self.logger.info(f"Найдена статья: {title}")
+            
+        if self.feed_cache is not None and pending is not None:
+            # Новые записи - в начало, самые старые вытесняются
+            fresh = set(new_keys)
+            keys = new_keys + [key for key in marks.get('keys') or () if key not in fresh]
+            pending['marks'] = {'keys': keys[:self.mark_size], 'newest': newest_seen}
+            
+        self.metrics.inc('entries_seen_total', seen)
+        self.metrics.inc('entries_known_total', known)
+        self.metrics.inc('entries_filtered_total', filtered)
+        self.metrics.observe('keyword_filter_seconds', filter_time, feed=blog_config['name'])
+        self.logger.info(f"{blog_config['name']}: обработано записей {seen}, "
+                         f"пропущено по отметке прошлого опроса {known}")
+        return articles, filter_time
 
     def parse_rss_feed(self, blog_config):
+        """Парсинг RSS фида (валидаторы фида в кэше не сохраняются)"""
+        articles, _ = self._fetch_feed_articles(blog_config)
+        return articles
+
+    def _fetch_feed_articles(self, blog_config):
+        """Загрузка и парсинг фида с учетом памяти, занятой его обработкой
+        
+        Возвращает кортеж (статьи, несохраненные поля кэша фида). Валидаторы
+        и отметка опроса сохраняются через _commit_feed_state только после записи
+        статей, иначе после ошибки записи следующий опрос получил бы 304 или
+        пропустил бы записи как известные, и статьи были бы потеряны.
+        """
+        pending = {}
+        rss_before = _peak_rss_bytes()
+        try:
+            return self._parse_feed(blog_config, pending), pending
+        finally:
+            if rss_before is not None:
+                # Пиковый объем памяти общий для процесса: при параллельной
+                # загрузке рост относится к фидам, обрабатывавшимся в этот момент
+                growth = _peak_rss_bytes() - rss_before
+                self.metrics.observe('feed_rss_growth_bytes', growth, feed=blog_config['name'])
+                if growth > self.max_feed_bytes:
+                    self.logger.warning(f"Обработка фида {blog_config['name']} увеличила пиковый объем "
+                                        f"памяти на {growth // (1024 * 1024)} МБ")
+
+    def _parse_feed(self, blog_config, pending):
         """Парсинг RSS фида с учетом различных вариантов структуры"""
         self.logger.info(f"Загрузка RSS фида {blog_config['name']}")
         
         # Если задан специальный метод парсинга, используем его
         if blog_config.get('parse_method') == 'direct_request':
-            return self._parse_with_direct_request(blog_config, self.headers.copy())
+            return self._parse_with_direct_request(blog_config, self.headers.copy(), pending)
             
         # Обычный парсинг через feedparser
         try:
@@ -243,15 +2708,31 @@ class ArticleParser:
             headers['User-Agent'] = self._get_random_user_agent()
             
             # Для надежности делаем HTTP-запрос вручную, а затем передаем ответ в feedparser
-            response = requests.get(blog_config['url'], headers=headers, timeout=20)
-            response.raise_for_status()  # Проверка на ошибки HTTP
+            fetch_start = time.perf_counter()
+            with self._open_feed(blog_config, headers) as (response, chunks):
+                if response.status_code == 304:
+                    # Фид не изменился с прошлой загрузки - парсинг не нужен
+                    self.logger.info(f"Фид {blog_config['name']} не изменился (304)")
+                    return []
+                response.raise_for_status()  # Проверка на ошибки HTTP
+                
+                body, complete = self._read_feed(chunks)
+                self.metrics.observe('fetch_seconds', time.perf_counter() - fetch_start, feed=blog_config['name'])
+                if not complete:
+                    # Большой фид разбираем по мере загрузки, не держа его в памяти целиком
+                    articles = self._parse_stream(chain(body, chunks), blog_config, pending)
+                    self._store_validators(pending, response)
+                    return articles
             
             # Парсинг RSS с помощью feedparser
-            feed = feedparser.parse(response.content)
+            import feedparser
+            with self.metrics.timer('parse_seconds', feed=blog_config['name']):
+                feed = feedparser.parse(body)
             
             if feed.bozo and not isinstance(feed.bozo_exception, (feedparser.ThingsNobodyCaresAboutButMe, TypeError)):
                 # Есть ошибка в XML структуре
                 self.logger.error(f"Ошибка парсинга фида {blog_config['name']}: {feed.bozo_exception}")
+                self._note_feed_error(blog_config, feed.bozo_exception)
                 return []
                 
             # Проверяем на пустой фид или ошибки
@@ -259,138 +2740,168 @@ class ArticleParser:
                 self.logger.warning(f"Пустой фид или ошибка структуры: {blog_config['name']}")
                 return []
                 
-            articles = []
-            
-            # Обрабатываем все записи из фида
-            for entry in feed.entries:
-                # Для AI-категории проверяем, относится ли статья к тематике ИИ
-                if blog_config.get('category') == 'AI' and not self.is_ai_related(entry):
-                    continue
-                    
-                # Формируем данные статьи
-                title = entry.get('title', '')
-                link = entry.get('link', '')
-                
-                # Проверка обязательных полей
-                if not title or not link:
-                    continue
-                    
-                # Получаем описание или содержимое
-                summary = ''
-                if hasattr(entry, 'summary'):
-                    summary = entry.summary
-                elif hasattr(entry, 'description'):
-                    summary = entry.description
-                    
-                # Получаем дату публикации
-                published = entry.get('published', '')
-                if not published:
-                    published = entry.get('updated', '')
-                    
-                # Создаем запись статьи
-                article = {
-                    'title': title,
-                    'url': link,
-                    'source': blog_config['name'],
-                    'category': blog_config.get('category', ''),
-                    'summary': summary,
-                    'published_date': published
-                }
-                
-                articles.append(article)
-                self.logger.info(f"Найдена статья: {title}")
-                
+            articles, _ = self._extract_articles(feed.entries, blog_config, pending)
+            self._store_validators(pending, response)
             return articles
         except Exception as e:
             self.logger.error(f"Ошибка при парсинге {blog_config['name']}: {str(e)}")
+            self._note_feed_error(blog_config, e)
             return []
 
-    def _parse_with_direct_request(self, blog_config, headers):
-        """Специальный метод парсинга для сайтов с проблемными XML"""
+    def _parse_with_direct_request(self, blog_config, headers, pending):
+        """Специальный метод парсинга для сайтов с проблемными XML
+        
+        Фид загружается один раз: если feedparser не справился с ответом,
+        те же байты разбираются потоковым резервным парсером. Фиды больше
+        stream_parse_bytes сразу разбираются резервным парсером по мере загрузки.
+        """
         try:
             # Добавляем случайный User-Agent
             headers['User-Agent'] = self._get_random_user_agent()
             
             # Делаем запрос напрямую
-            response = requests.get(blog_config['url'], headers=headers, timeout=20)
-            response.raise_for_status()
+            fetch_start = time.perf_counter()
+            with self._open_feed(blog_config, headers) as (response, chunks):
+                if response.status_code == 304:
+                    self.logger.info(f"Фид {blog_config['name']} не изменился (304)")
+                    return []
+                response.raise_for_status()
+                
+                content, complete = self._read_feed(chunks)
+                self.metrics.observe('fetch_seconds', time.perf_counter() - fetch_start, feed=blog_config['name'])
+                if not complete:
+                    articles = self._parse_stream(chain(content, chunks), blog_config, pending)
+                    self._store_validators(pending, response)
+                    return articles
             
             # Пытаемся сначала обработать как обычный XML
+            import feedparser
+            feed = None
+            parse_start = time.perf_counter()
             try:
-                feed = feedparser.parse(response.content)
-                
-                if not hasattr(feed, 'entries') or not feed.entries or (feed.bozo and not isinstance(feed.bozo_exception, (feedparser.ThingsNobodyCaresAboutButMe, TypeError))):
-                    # Если есть ошибка в XML, пробуем обработать контент вручную
-                    raise Exception("Invalid XML, trying to parse manually")
-                    
-                # Если успешно распарсили через feedparser, используем стандартный метод
-                return self.parse_rss_feed({**blog_config, 'parse_method': None})
-                    
+                feed = feedparser.parse(content)
             except Exception as xml_error:
-                self.logger.warning(f"Стандартный парсинг не удался для {blog_config['name']}, пробуем ручной парсинг: {str(xml_error)}")
+                self.logger.warning(f"Ошибка feedparser для {blog_config['name']}: {str(xml_error)}")
                 
-                # Получаем текст и пытаемся найти элементы RSS вручную
-                content = response.text
+            if feed is not None and self._is_feed_ok(feed):
+                self.metrics.observe('parse_seconds', time.perf_counter() - parse_start, feed=blog_config['name'])
+                articles, _ = self._extract_articles(feed.entries, blog_config, pending)
+            else:
+                # Если есть ошибка в XML, разбираем уже загруженный ответ в режиме восстановления
+                self.logger.warning(f"Стандартный парсинг не удался для {blog_config['name']}, "
+                                    f"используем резервный потоковый парсер")
+                self.metrics.inc('errors_total', type='MalformedFeed', stage='parse')
+                articles, filter_time = self._extract_articles(self._iter_fallback_entries(content), blog_config,
+                                                              pending)
+                # Резервный парсер работает вперемешку с фильтрацией - ее время вычитаем
+                self.metrics.observe('parse_seconds', time.perf_counter() - parse_start - filter_time,
+                                     feed=blog_config['name'])
                 
-                # Простой алгоритм извлечения элементов из XML
-                articles = []
-                items = content.split('<item')
-                
-                for item in items[1:]:  # Пропускаем первый элемент (заголовок)
-                    try:
-                        # Извлекаем основные поля
-                        title_match = re.search(r'<title[^>]*>(.*?)</title>', item, re.DOTALL)
-                        link_match = re.search(r'<link[^>]*>(.*?)</link>', item, re.DOTALL)
-                        description_match = re.search(r'<description[^>]*>(.*?)</description>', item, re.DOTALL)
-                        date_match = re.search(r'<pubDate[^>]*>(.*?)</pubDate>', item, re.DOTALL)
-                        
-                        if title_match and link_match:
-                            title = title_match.group(1).strip()
-                            link = link_match.group(1).strip()
-                            
-                            # Очищаем от CDATA и экранирования
-                            title = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', title)
-                            link = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', link)
-                            
-                            # Создаем описание если есть
-                            summary = ''
-                            if description_match:
-                                summary = description_match.group(1).strip()
-                                summary = re.sub(r'<!\[CDATA\[(.*?)\]\]>', r'\1', summary)
-                                
-                            # Дата публикации если есть
-                            published = ''
-                            if date_match:
-                                published = date_match.group(1).strip()
-                                
-                            # Проверяем на тематику ИИ, если нужно
-                            is_ai = True
-                            if blog_config.get('category') == 'AI':
-                                all_text = (title + ' ' + summary).lower()
-                                is_ai = any(keyword in all_text for keyword in self.ai_keywords)
-                                
-                            if is_ai:
-                                article = {
-                                    'title': title,
-                                    'url': link,
-                                    'source': blog_config['name'],
-                                    'category': blog_config.get('category', ''),
-                                    'summary': summary,
-                                    'published_date': published
-                                }
-                                
-                                articles.append(article)
-                                self.logger.info(f"Найдена статья: {title}")
-                    except Exception as item_error:
-                        self.logger.error(f"Ошибка при парсинге элемента: {str(item_error)}")
-                        continue
-                        
-                return articles
+            self._store_validators(pending, response)
+            return articles
                 
         except Exception as e:
             self.logger.error(f"Ошибка при прямом парсинге {blog_config['name']}: {str(e)}")
+            self._note_feed_error(blog_config, e)
             return []
 
+    def _parse_stream(self, chunks, blog_config, pending):
+        """Разбор фида резервным парсером по мере загрузки частей тела"""
+        self.logger.info(f"Фид {blog_config['name']} больше {self.stream_parse_bytes} байт, "
+                         f"потоковый разбор")
+        parse_start = time.perf_counter()
+        articles, filter_time = self._extract_articles(self._iter_stream_entries(chunks), blog_config, pending)
+        # Время включает дозагрузку фида, время фильтрации вычитаем
+        self.metrics.observe('parse_seconds', time.perf_counter() - parse_start - filter_time,
+                             feed=blog_config['name'])
+        return articles
+
+    def _iter_fallback_entries(self, content, chunk_size=65536):
+        """Потоковый разбор загруженного некорректного XML фида"""
+        view = memoryview(content)
+        return self._iter_stream_entries(
+            bytes(view[offset:offset + chunk_size]) for offset in range(0, len(view), chunk_size)
+        )
+
+    def _iter_stream_entries(self, chunks):
+        """Потоковый разбор XML фида (RSS <item> и Atom <entry>) из частей тела
+        
+        Данные подаются в XMLPullParser частями в режиме recover, обработанные
+        элементы сразу удаляются из дерева, поэтому память не растет с размером фида.
+        Если разбор остановлен досрочно, оставшиеся части не читаются.
+        """
+        from lxml import etree
+        parser = etree.XMLPullParser(events=('end',), recover=True, resolve_entities=False, huge_tree=True)
+        
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from self._read_fallback_events(parser)
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        yield from self._read_fallback_events(parser)
+
+    def _read_fallback_events(self, parser):
+        """Извлечение готовых записей из событий XMLPullParser"""
+        from lxml import etree
+        for _, element in parser.read_events():
+            if not isinstance(element.tag, str):
+                continue
+            if etree.QName(element).localname not in ('item', 'entry'):
+                continue
+            try:
+                entry = self._fallback_entry(element)
+                if entry:
+                    yield entry
+            except Exception as item_error:
+                self.logger.error(f"Ошибка при парсинге элемента: {str(item_error)}")
+            finally:
+                # Освобождаем обработанный элемент и предыдущих соседей. Если из-за
+                # незакрытого тега запись оказалась вложенной в другую запись,
+                # соседей не трогаем - это поля внешней записи.
+                element.clear()
+                parent = element.getparent()
+                if parent is not None and etree.QName(parent).localname not in ('item', 'entry'):
+                    while element.getprevious() is not None:
+                        del parent[0]
+
+    @staticmethod
+    def _fallback_entry(element):
+        """Преобразование элемента <item>/<entry> в запись, совместимую с feedparser"""
+        from lxml import etree
+        entry = {}
+        for child in element:
+            if not isinstance(child.tag, str):
+                continue
+            name = etree.QName(child).localname
+            text = (child.text or '').strip()
+            
+            if name == 'title':
+                entry.setdefault('title', ''.join(child.itertext()).strip())
+            elif name == 'link':
+                # В Atom ссылка задается атрибутом href, приоритет у rel="alternate"
+                href = child.get('href')
+                if href:
+                    if child.get('rel', 'alternate') == 'alternate' or 'link' not in entry:
+                        entry['link'] = href.strip()
+                elif text:
+                    entry['link'] = text
+            elif name == 'guid' and text.startswith('http'):
+                entry.setdefault('guid', text)
+            elif name in ('description', 'summary'):
+                entry.setdefault('summary', ''.join(child.itertext()).strip())
+            elif name in ('encoded', 'content'):
+                entry.setdefault('content', [{'value': ''.join(child.itertext()).strip()}])
+            elif name in ('pubDate', 'published', 'date'):
+                entry.setdefault('published', text)
+            elif name == 'updated':
+                entry.setdefault('updated', text)
+                
+        if not entry.get('link') and entry.get('guid'):
+            entry['link'] = entry['guid']
+        return entry
+
     def save_to_supabase(self, article_data):
         """Сохранение статьи в Supabase с проверкой на дубликаты"""
         try:
@@ -408,68 +2919,812 @@ class ArticleParser:
                 self.logger.error(f"Ошибка добавления статьи в Supabase: {insert_response.error}")
                 return False
                 
+            if self.seen_index is not None:
+                self.seen_index.add(article_data['url'])
             self.logger.info(f"Статья добавлена в Supabase: {article_data['title']}")
             return True
         except Exception as e:
             self.logger.error(f"Ошибка при сохранении в Supabase: {str(e)}")
             return False
 
-    def process_articles(self):
-        """Обработка статей из всех источников"""
-        start_time = datetime.now()
-        self.logger.info(f"Начало проверки в {start_time.isoformat()}")
+    def save_articles_bulk(self, articles, batch_size=None, strict=False):
+        """Пакетное сохранение статей в хранилище
+        
+        Дубликаты внутри списка отбрасываются в памяти, а запись выполняется
+        пакетами по batch_size статей (в Supabase - через upsert(on_conflict='url')),
+        поэтому уже существующие статьи пропускаются без отдельного запроса.
+        При strict=True ошибка записи пакета прерывает сохранение исключением.
+        Возвращает кортеж (добавлено, пропущено).
+        """
+        batch_size = max(1, int(batch_size or self.batch_size))
+        
+        # Убираем повторы внутри списка (по нормализованному URL)
+        unique_articles = {}
+        for article in articles:
+            if not article.get('url'):
+                continue
+            key = normalize_url(article['url'])
+            if key not in unique_articles:
+                unique_articles[key] = article
+        skipped = len(articles) - len(unique_articles)
+        inserted = 0
+        
+        pending = list(unique_articles.values())
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                batch_inserted, batch_skipped = self._write_batch(batch)
+                
+                # После записи все URL пакета есть в хранилище
+                if self.seen_index is not None:
+                    for article in batch:
+                        self.seen_index.add(article['url'])
+                inserted += batch_inserted
+                skipped += batch_skipped
+            except Exception as e:
+                self.metrics.inc('errors_total', type=type(e).__name__, stage='save')
+                if strict:
+                    raise
+                self.logger.error(f"Ошибка при пакетном сохранении статей: {str(e)}")
+                
+        return inserted, skipped
+
+    def _write_batch(self, batch):
+        """Запись одного пакета в хранилище; возвращает (добавлено, пропущено)"""
+        with self.metrics.timer('save_seconds'):
+            rows = self.storage.insert_batch(batch)
+        for row in rows:
+            self.logger.info(f"Статья добавлена в хранилище: {row.get('title', row.get('url'))}")
+        return len(rows), len(batch) - len(rows)
+
+    def _write_batch_async(self, batch):
+        """Запись пакета из фонового потока WriteBehindBuffer"""
+        try:
+            inserted, skipped = self._write_batch(batch)
+        except Exception as e:
+            self.metrics.inc('errors_total', type=type(e).__name__, stage='save')
+            raise
+        self.metrics.inc('entries_inserted_total', inserted)
+        self.metrics.inc('entries_duplicate_total', skipped)
+        return inserted, skipped
+
+    def _save_articles(self, blog, articles, known=0, pending=None):
+        """Сохранение подготовленных статей одного источника
+        
+        known - число статей, уже отброшенных по локальному индексу. Поля кэша
+        фида (pending) сохраняются после записи статей; при отложенной записи -
+        когда статьи записаны в хранилище или на диск.
+        """
+        if not articles and not known:
+            self._commit_feed_state(blog['url'], pending)
+            return 0, 0
+            
+        if self.write_buffer is not None:
+            # Запись в фоне: новые (по локальному индексу) статьи считаются добавленными,
+            # точные итоги записи попадают в метрики и лог после flush
+            unique = list({normalize_url(article['url']): article for article in articles}.values())
+            self.write_buffer.put(unique, lambda: self._articles_stored(blog['url'], unique, pending))
+            skipped = known + len(articles) - len(unique)
+            self.metrics.inc('entries_duplicate_total', skipped)
+            self.logger.info(f"{blog['name']}: в очередь записи {len(unique)}, пропущено {skipped} "
+                             f"(из них {known} по локальному индексу)")
+            return len(unique), skipped
+            
+        inserted, skipped = self.save_articles_bulk(articles, strict=True) if articles else (0, 0)
+        self._commit_feed_state(blog['url'], pending)
+        skipped += known
+        self.metrics.inc('entries_inserted_total', inserted)
+        self.metrics.inc('entries_duplicate_total', skipped)
+        self.logger.info(f"{blog['name']}: добавлено {inserted}, пропущено {skipped} "
+                         f"(из них {known} по локальному индексу)")
+        return inserted, skipped
+
+    def _articles_stored(self, url, articles, pending):
+        """Статьи фида записаны в хранилище или на диск фоновым потоком записи"""
+        if self.seen_index is not None:
+            for article in articles:
+                self.seen_index.add(article['url'])
+        self._commit_feed_state(url, pending)
+
+    def _prepare_articles(self, articles):
+        """Подготовка статей к записи: отбор новых и поиск перепечаток
+        
+        Возвращает кортеж (статьи для записи, число статей, известных по локальному индексу).
+        """
+        # Отбрасываем статьи, уже известные по локальному индексу, без обращения к базе
+        known = 0
+        if self.seen_index is not None:
+            fresh = [article for article in articles if article['url'] not in self.seen_index]
+            known = len(articles) - len(fresh)
+            articles = fresh
+            
+        if self.near_duplicates is not None:
+            self._tag_near_duplicates(articles)
+        return articles, known
+
+    @staticmethod
+    def _near_duplicate_text(article):
+        """Текст статьи, по которому ищутся перепечатки"""
+        return f"{article.get('title') or ''} {article.get('summary') or ''}"
+
+    def _warm_near_duplicates(self):
+        """Заполнение индекса перепечаток статьями хранилища за окно индекса
+        
+        Индекс заполняется заново (в отдельном объекте), поэтому при ошибке
+        текущий индекс остается прежним, а заполнение повторяется в следующем цикле.
+        """
+        current = self.near_duplicates
+        if self.storage is None or not hasattr(self.storage, 'iter_recent'):
+            self._near_duplicates_warm = True
+            return
+        index = NearDuplicateIndex(current.window / 3600, current.max_distance, current.bands)
+        try:
+            for article in self.storage.iter_recent(time.time() - index.window):
+                if article.get('url') and article.get('added_at') is not None:
+                    index.add(article['url'], self._near_duplicate_text(article), article['added_at'],
+                              article.get('duplicate_of'))
+        except Exception as e:
+            self.logger.error(f"Ошибка заполнения индекса перепечаток: {str(e)}")
+            return
+        self.near_duplicates = index
+        self._near_duplicates_warm = True
+        self.logger.info(f"Индекс перепечаток заполнен по хранилищу: {len(index)} статей")
+
+    def _tag_near_duplicates(self, articles):
+        """Пометка статей, почти совпадающих с недавними; возвращает помеченные статьи"""
+        duplicates = []
+        for article in articles:
+            original = self.near_duplicates.match(article['url'], self._near_duplicate_text(article))
+            article['status'] = 'duplicate' if original else 'new'
+            article['duplicate_of'] = original
+            if original:
+                duplicates.append(article)
+                self.logger.info(f"Статья {article['url']} почти совпадает с {original}")
+        if duplicates:
+            self.metrics.inc('entries_near_duplicate_total', len(duplicates))
+        return duplicates
+
+    def _get_content_executor(self):
+        """Общий пул потоков загрузки страниц статей"""
+        with self._content_executor_lock:
+            if self._content_executor is None:
+                self._content_executor = ThreadPoolExecutor(max_workers=self.content_workers,
+                                                            thread_name_prefix='content')
+            return self._content_executor
+
+    def _fetch_article_content(self, url):
+        """Загрузка страницы статьи (или чтение из кэша) и извлечение основного текста"""
+        try:
+            body = self.content_cache.get(url) if self.content_cache is not None else None
+            if body is not None:
+                self.metrics.inc('content_cache_hits_total')
+            else:
+                headers = self.headers.copy()
+                headers['User-Agent'] = self._get_random_user_agent()
+                headers['Accept'] = 'text/html,application/xhtml+xml'
+                with self.metrics.timer('content_fetch_seconds'):
+                    response, body, truncated = self._download(url, headers, self.content_max_bytes,
+                                                               host_delay=self.content_host_delay)
+                if response.status_code != 200:
+                    self.logger.warning(f"Не удалось загрузить статью {url}: HTTP {response.status_code}")
+                    self.metrics.inc('errors_total', type=f"HTTP{response.status_code}", stage='content')
+                    return None
+                content_type = response.headers.get('Content-Type', '')
+                if content_type and 'html' not in content_type:
+                    self.logger.info(f"Статья {url} не является HTML-страницей ({content_type})")
+                    return None
+                if truncated:
+                    self.logger.warning(f"Страница {url} больше {self.content_max_bytes} байт, "
+                                        f"используется начало страницы")
+                self.metrics.inc('content_fetched_total')
+                self.metrics.observe('content_bytes', len(body))
+                if self.content_cache is not None:
+                    self.content_cache.put(url, body)
+                    
+            with self.metrics.timer('content_extract_seconds'):
+                text = extract_main_text(body)
+            return text or None
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки текста статьи {url}: {str(e)}")
+            self.metrics.inc('errors_total', type=type(e).__name__, stage='content')
+            return None
+
+    def _fetch_article_texts(self, articles):
+        """Загрузка полного текста статей фида, кроме перепечаток"""
+        # Для перепечаток текст не загружаем - он есть у первой статьи кластера
+        originals = []
+        for article in articles:
+            if article.get('status') == 'duplicate':
+                article['content'] = None
+            else:
+                originals.append(article)
+        if originals:
+            self._fetch_contents(originals)
+
+    def _get_content_stage(self):
+        """Пул потоков этапа загрузки текста: статьи фида ждут в нем свои страницы,
+        не задерживая сохранение статей других фидов"""
+        with self._content_executor_lock:
+            if self._content_stage is None:
+                self._content_stage = ThreadPoolExecutor(max_workers=self.content_workers,
+                                                         thread_name_prefix='content-stage')
+            return self._content_stage
+
+    def _wait_content_stage(self):
+        """Ожидание записи статей фидов, загружавших текст статей в этом цикле"""
+        tasks, self._content_stage_tasks = self._content_stage_tasks, []
+        for blog, future in tasks:
+            try:
+                future.result()
+            except Exception as e:
+                self.logger.error(f"Ошибка при обработке {blog['name']}: {str(e)}")
+                self._note_feed_error(blog, e)
+
+    def _fetch_contents(self, articles):
+        """Добавление полного текста к статьям (поле content)"""
+        executor = self._get_content_executor()
+        futures = {executor.submit(self._fetch_article_content, article['url']): article
+                   for article in articles}
+        fetched = 0
+        for future in as_completed(futures):
+            content = future.result()
+            futures[future]['content'] = content
+            if content:
+                fetched += 1
+        self.logger.info(f"Загружен текст {fetched} из {len(articles)} статей")
+
+    def _set_keywords(self, keywords):
+        """Установка наборов ключевых слов; выражения пересобираются только для измененных наборов"""
+        matchers = {}
+        for category, words in keywords.items():
+            current = self.keyword_matchers.get(category)
+            if current is not None and current.keywords == KeywordMatcher.normalize(words):
+                matchers[category] = current
+            else:
+                matchers[category] = KeywordMatcher(words)
+                self.logger.info(f"Ключевые слова категории {category}: {len(matchers[category].keywords)}")
+        self.keyword_matchers = matchers
+        self.ai_matcher = matchers.get('AI')
+        self.ai_keywords = list(self.ai_matcher.keywords) if self.ai_matcher is not None else []
+
+    def _apply_sources(self, sources, keywords):
+        """Применение источников и ключевых слов, загруженных из файла"""
+        self.blogs = sources
+        self._set_keywords(keywords)
+        self.logger.info(f"Загружено источников из {self.source_registry.path}: {len(sources)}")
+
+    def reload_sources(self):
+        """Перечитывание файла источников, если он изменился; True - если конфигурация обновлена
+        
+        При ошибке в файле остается прежняя конфигурация.
+        """
+        if self.source_registry is None or not self.source_registry.changed():
+            return False
+        try:
+            sources, keywords = self.source_registry.load()
+        except Exception as e:
+            self.logger.error(f"Ошибка загрузки источников из {self.source_registry.path}, "
+                              f"используется прежний список: {str(e)}")
+            return False
+        self._apply_sources(sources, keywords)
+        return True
+
+    def _sync_schedule(self, scheduler):
+        """Приведение расписания к текущему списку источников"""
+        blogs = {blog['url']: blog for blog in self._shard_blogs()}
+        scheduled = scheduler.urls()
+        for url in scheduled - blogs.keys():
+            scheduler.remove(url)
+        for url, blog in blogs.items():
+            if url in scheduled:
+                scheduler.refresh(blog)
+            else:
+                scheduler.add(blog)
+        self.logger.info(f"Расписание обновлено: добавлено {len(blogs.keys() - scheduled)}, "
+                         f"удалено {len(scheduled - blogs.keys())} источников")
+
+    def _parse_weighted(self, blog):
+        """Парсинг фида с учетом его веса в общем лимите одновременных загрузок"""
+        with self._feed_slots.hold(blog.get('weight', 1)):
+            return self._fetch_feed_articles(blog)
+
+    def _shard_blogs(self):
+        """Источники, относящиеся к шарду этого узла
+        
+        Шард определяется по crc32 от URL фида, поэтому распределение не зависит
+        от порядка источников в списке.
+        """
+        if self.shard_count <= 1:
+            return list(self.blogs)
+        return [
+            blog for blog in self.blogs
+            if zlib.crc32(blog['url'].encode('utf-8')) % self.shard_count == self.shard_index
+        ]
+
+    def _handle_feed_result(self, blog, articles, results, pending=None):
+        """Сохранение статей фида и запись итога обработки в results
         
-        # Обрабатываем все источники
-        for blog in self.blogs:
+        Валидаторы и отметка опроса фида (pending) сохраняются, только если статьи
+        записаны или переданы на запись; при ошибке записи фид считается
+        необработанным и при следующем опросе разбирается заново.
+        Если нужно загрузить текст статей, запись выполняется в фоне после
+        загрузки (см. _wait_content_stage).
+        """
+        articles, known = self._prepare_articles(articles) if articles else ([], 0)
+        if self.fetch_content and articles:
+            future = self._get_content_stage().submit(self._store_feed_result, blog, articles, known,
+                                                      results, pending)
+            self._content_stage_tasks.append((blog, future))
+            return
+        self._store_feed_result(blog, articles, known, results, pending)
+
+    def _store_feed_result(self, blog, articles, known, results, pending):
+        """Загрузка текста (если нужна) и запись подготовленных статей фида"""
+        if self.fetch_content and articles:
+            self._fetch_article_texts(articles)
+            
+        if self.work_queue is not None:
+            self._complete_feed_job(blog, articles, known, results)
+            self._commit_feed_state(blog['url'], pending)
+            return
+        try:
+            inserted, skipped = self._save_articles(blog, articles, known, pending)
+        except Exception as e:
+            self.logger.error(f"{blog['name']}: ошибка записи статей: {str(e)}")
+            results[blog['url']] = {'inserted': 0, 'skipped': 0, 'error': type(e).__name__}
+            return
+        results[blog['url']] = {
+            'inserted': inserted,
+            'skipped': skipped,
+            'error': self.feed_errors.get(blog['url']),
+        }
+
+    def _lease_feed_jobs(self, blogs):
+        """Постановка фидов в очередь и выдача заданий этапа загрузки
+        
+        Кроме переданных фидов выдаются задания, не завершенные до аварийной
+        остановки прошлого запуска. Возвращает список фидов для обработки.
+        """
+        for blog in blogs:
+            self.work_queue.put('feed', blog, key=blog['url'])
+            
+        current = {blog['url']: blog for blog in self.blogs}
+        requested = {blog['url'] for blog in blogs}
+        self._feed_jobs = {}
+        leased = []
+        for job_id, blog, _ in self.work_queue.lease('feed'):
+            blog = current.get(blog['url'], blog)
+            self._feed_jobs[blog['url']] = job_id
+            leased.append(blog)
+            
+        resumed = [blog['name'] for blog in leased if blog['url'] not in requested]
+        if resumed:
+            self.logger.info(f"Продолжение незавершенной обработки: {', '.join(resumed)}")
+        return leased
+
+    def _complete_feed_job(self, blog, articles, known, results):
+        """Завершение этапа загрузки фида: статьи ставятся в очередь записи в той же транзакции"""
+        payload = {'feed': blog['url'], 'name': blog['name'], 'articles': articles}
+        job_id = self._feed_jobs.pop(blog['url'], None)
+        if job_id is None:
+            if articles:
+                self.work_queue.put('save', payload)
+        else:
+            self.work_queue.ack(job_id, 'save' if articles else None, payload)
+            
+        self.metrics.inc('entries_duplicate_total', known)
+        results[blog['url']] = {
+            'inserted': 0,
+            'skipped': known,
+            'error': self.feed_errors.get(blog['url']),
+        }
+
+    def _run_save_stage(self, results=None):
+        """Запись статей из очереди: ошибки записи повторяются с растущей паузой"""
+        inserted_total = 0
+        for job_id, payload, attempt in self.work_queue.lease('save'):
+            name = payload['name']
+            try:
+                inserted, skipped = self.save_articles_bulk(payload['articles'], strict=True)
+            except Exception as e:
+                if self.work_queue.retry(job_id, e):
+                    self.metrics.inc('queue_retries_total')
+                    self.logger.warning(f"{name}: ошибка записи статей (попытка {attempt}): {str(e)}, "
+                                        f"повтор позже")
+                else:
+                    self.metrics.inc('queue_failed_total')
+                    self.logger.error(f"{name}: запись статей не удалась после {attempt} попыток: {str(e)}, "
+                                      f"задание оставлено в {self.work_queue.path}")
+                continue
+                
+            self.work_queue.ack(job_id)
+            inserted_total += inserted
+            self.metrics.inc('entries_inserted_total', inserted)
+            self.metrics.inc('entries_duplicate_total', skipped)
+            self.logger.info(f"{name}: добавлено {inserted}, пропущено {skipped}")
+            if results is not None and payload['feed'] in results:
+                results[payload['feed']]['inserted'] += inserted
+                results[payload['feed']]['skipped'] += skipped
+        return inserted_total
+
+    def _process_sequential(self, blogs, results):
+        """Последовательная обработка, паузы между запросами к хосту соблюдает _http_stream"""
+        for blog in blogs:
             try:
                 self.logger.info(f"Обработка {blog['name']}...")
                 
                 # Парсим RSS фид
-                articles = self.parse_rss_feed(blog)
+                articles, pending = self._fetch_feed_articles(blog)
                 
                 # Сохраняем статьи в Supabase
-                for article in articles:
-                    self.save_to_supabase(article)
-                    
-                # Задержка между обработкой источников
-                time.sleep(2)
+                self._handle_feed_result(blog, articles, results, pending)
             except Exception as e:
                 self.logger.error(f"Ошибка при обработке {blog['name']}: {str(e)}")
+                self._note_feed_error(blog, e)
+
+    def _process_with_threads(self, blogs, results):
+        """Параллельная загрузка: статьи сохраняются по мере готовности фидов"""
+        self.logger.info(f"Параллельная загрузка фидов: {self.max_workers} потоков, "
+                         f"до {self.per_host_limit} запросов на хост")
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._parse_weighted, blog): blog for blog in blogs}
+            
+            for future in as_completed(futures):
+                blog = futures[future]
+                try:
+                    articles, pending = future.result()
+                    self._handle_feed_result(blog, articles, results, pending)
+                except Exception as e:
+                    self.logger.error(f"Ошибка при обработке {blog['name']}: {str(e)}")
+                    self._note_feed_error(blog, e)
+
+    def _process_with_processes(self, blogs, results):
+        """Парсинг фидов в пуле процессов, сохранение - в родительском процессе
+        
+        Каждый процесс соблюдает ограничения на хост только для своих запросов,
+        поэтому фиды одного хоста передаются одному процессу одним заданием.
+        Фиды, которые не удалось обработать из-за сбоя дочернего процесса,
+        повторно обрабатываются в родительском процессе.
+        """
+        groups = {}
+        for blog in blogs:
+            groups.setdefault(urlparse(blog['url']).netloc.lower(), []).append(blog)
+        # Большие группы запускаются первыми, чтобы не задерживать конец цикла
+        tasks = sorted(groups.values(), key=len, reverse=True)
+        self.logger.info(f"Многопроцессный парсинг фидов: {self.processes} процессов, {len(tasks)} хостов")
+        failed = []
+        
+        with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_process_worker,
+                                 initargs=(self,)) as executor:
+            futures = {executor.submit(_parse_in_process, group): group for group in tasks}
+            
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    names = ', '.join(blog['name'] for blog in group)
+                    self.logger.error(f"Сбой процесса при обработке {names}: {str(e)}")
+                    self.metrics.inc('errors_total', type=type(e).__name__, stage='process')
+                    failed.extend(group)
+                    continue
+                    
+                if self.feed_cache is not None:
+                    self.feed_cache.merge_stats(outcome['hits'], outcome['misses'])
+                self.metrics.merge(outcome['metrics'])
+                for blog, feed in zip(group, outcome['feeds']):
+                    if feed['failed']:
+                        self.logger.error(f"Сбой при обработке {blog['name']} в дочернем процессе: {feed['failed']}")
+                        self.metrics.inc('errors_total', type=feed['failed'].split(':', 1)[0], stage='process')
+                        failed.append(blog)
+                        continue
+                    if feed['error']:
+                        self.feed_errors[blog['url']] = feed['error']
+                    try:
+                        self._handle_feed_result(blog, feed['articles'], results, feed['pending'])
+                    except Exception as e:
+                        self.logger.error(f"Ошибка при обработке {blog['name']}: {str(e)}")
+                        self._note_feed_error(blog, e)
+                    
+        if failed:
+            self.logger.warning(f"Повторная обработка {len(failed)} источников в основном процессе")
+            if self.max_workers > 1 and len(failed) > 1:
+                self._process_with_threads(failed, results)
+            else:
+                self._process_sequential(failed, results)
+
+    def process_articles(self, blogs=None, persist=True):
+        """Обработка статей из всех источников (или только из переданных blogs)
+        
+        При persist=False кэш фидов, индекс URL и сводка метрик не сохраняются,
+        а метрики цикла продолжают накапливаться - их сохраняет вызывающий
+        через _save_state (периодический режим).
+        Возвращает словарь URL фида -> {'inserted', 'skipped', 'error'}.
+        """
+        start_time = datetime.now()
+        self.logger.info(f"Начало проверки в {start_time.isoformat()}")
+        if self.feed_cache is not None:
+            self.feed_cache.reset_stats()
+        self.feed_errors = {}
+        if persist:
+            self.metrics.start_cycle()
+            
+        if blogs is None:
+            blogs = self._shard_blogs()
+            if self.shard_count > 1:
+                self.logger.info(f"Шард {self.shard_index} из {self.shard_count}: {len(blogs)} источников")
+        
+        if self._seen_index is not None and not self._seen_index.complete:
+            self._warm_seen_index(self._seen_index)
+        if self.near_duplicates is not None and not self._near_duplicates_warm:
+            self._warm_near_duplicates()
+            
+        connections_before = self.connection_stats()
+        results = {}
+        if self.work_queue is not None:
+            blogs = self._lease_feed_jobs(blogs)
+            
+        if self.processes > 1 and len(blogs) > 1:
+            self._process_with_processes(blogs, results)
+        elif self.max_workers > 1 and len(blogs) > 1:
+            self._process_with_threads(blogs, results)
+        else:
+            self._process_sequential(blogs, results)
+        self._wait_content_stage()
+            
+        # Источники, упавшие до сохранения, отмечаем ошибкой
+        for blog in blogs:
+            if blog['url'] not in results:
+                results[blog['url']] = {
+                    'inserted': 0,
+                    'skipped': 0,
+                    'error': self.feed_errors.get(blog['url'], 'Unknown'),
+                }
+                
+        if self.work_queue is not None:
+            # Фиды, упавшие до постановки статей в очередь, повторно опросит планировщик
+            for job_id in self._feed_jobs.values():
+                self.work_queue.ack(job_id)
+            self._feed_jobs = {}
+            self._run_save_stage(results)
+            pending = self.work_queue.pending('save')
+            if pending:
+                self.logger.warning(f"В очереди записи осталось {pending} заданий, они будут повторены позже")
+                
+        if self.feed_cache is not None:
+            self.logger.info(f"Кэш фидов: {self.feed_cache.hits} без изменений (304), "
+                             f"{self.feed_cache.misses} загружено полностью")
+        # Отметки фидов с отложенной записью сохраняются после записи их статей
+        self._flush_write_buffer()
+        self._log_connection_stats(connections_before)
                 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
-        self.logger.info(f"Проверка завершена за {duration:.2f} секунд")
+        self.metrics.observe('cycle_seconds', duration)
+        peak_rss = _peak_rss_bytes()
+        if peak_rss is not None:
+            self.metrics.observe('process_peak_rss_bytes', peak_rss)
+        if persist:
+            self._save_state(start_time, results)
+        self.logger.info(f"Проверка завершена за {duration:.2f} секунд ({len(blogs)} источников)")
+        return results
+
+    def _save_state(self, start_time, results):
+        """Сохранение измененных кэша фидов и индекса URL и сводки метрик с start_time"""
+        if self.feed_cache is not None and self.feed_cache.dirty:
+            try:
+                self.feed_cache.save()
+            except Exception as e:
+                self.logger.error(f"Ошибка сохранения кэша фидов: {str(e)}")
+        self._save_seen_index()
+        duration = (datetime.now() - start_time).total_seconds()
+        self._write_cycle_summary(start_time, duration, results)
+
+    def _flush_write_buffer(self):
+        """Ожидание фоновой записи статей, накопленных за цикл"""
+        if self.write_buffer is None:
+            return
+        buffer = self.write_buffer
+        inserted, skipped, spilled, rejected = buffer.inserted, buffer.skipped, buffer.spilled, buffer.rejected
+        buffer.flush()
+        self.logger.info(f"Отложенная запись: добавлено {buffer.inserted - inserted}, "
+                         f"пропущено {buffer.skipped - skipped}, "
+                         f"сохранено на диск {buffer.spilled - spilled}, "
+                         f"отклонено хранилищем {buffer.rejected - rejected}")
+
+    def close(self):
+        """Завершение работы: запись оставшихся статей и закрытие хранилища"""
+        if self._content_stage is not None:
+            self._wait_content_stage()
+            self._content_stage.shutdown(wait=True)
+            self._content_stage = None
+        if self._content_executor is not None:
+            self._content_executor.shutdown(wait=True)
+            self._content_executor = None
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+        if self.work_queue is not None:
+            self.work_queue.close()
+            self.work_queue = None
+        self._save_seen_index()
+        if self.storage is not None:
+            try:
+                self.storage.close()
+            except Exception as e:
+                self.logger.error(f"Ошибка закрытия хранилища: {str(e)}")
+        if self.dns_cache is not None:
+            DnsCache.uninstall()
+            self.dns_cache = None
+
+    def _log_connection_stats(self, before):
+        """Статистика соединений за цикл (в многопроцессном режиме - только основного процесса)"""
+        after = self.connection_stats()
+        requests_count = after['requests'] - before['requests']
+        new_connections = after['new_connections'] - before['new_connections']
+        reused = max(0, requests_count - new_connections)
+        self.metrics.inc('http_requests_total', requests_count)
+        self.metrics.inc('http_connections_new_total', new_connections)
+        self.metrics.inc('http_connections_reused_total', reused)
+        self.logger.info(f"Соединения: {requests_count} запросов, {new_connections} новых, "
+                         f"{reused} переиспользовано")
+
+    def _write_cycle_summary(self, start_time, duration, results):
+        """Запись JSON-сводки метрик цикла"""
+        summary = self.metrics.cycle_summary()
+        summary.update({
+            'started_at': start_time.isoformat(),
+            'duration_seconds': duration,
+            'feeds': len(results),
+            'feeds_failed': sum(1 for result in results.values() if result['error']),
+        })
+        
+        stages = summary['stages']
+        self.logger.info(
+            "Этапы цикла: " + ', '.join(
+                f"{name} {stages[name]['sum']:.2f} с"
+                for name in ('fetch_seconds', 'parse_seconds', 'keyword_filter_seconds', 'save_seconds')
+                if name in stages
+            )
+        )
+        
+        if not self.metrics_path:
+            return
+        try:
+            with open(self.metrics_path, 'w') as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.error(f"Ошибка записи сводки метрик: {str(e)}")
 
-    def run_scheduled(self, interval_minutes=60):
-        """Запуск периодической проверки"""
-        self.logger.info(f"Запуск периодической проверки каждые {interval_minutes} минут")
+    def run_scheduled(self, interval_minutes=60, min_interval_minutes=5, max_interval_minutes=24 * 60):
+        """Запуск периодической проверки с адаптивным интервалом для каждого фида
         
-        # Немедленно запускаем первую проверку
-        self.process_articles()
+        interval_minutes - начальный интервал опроса, min/max_interval_minutes - его границы.
+        """
+        self.logger.info(f"Запуск периодической проверки: начальный интервал {interval_minutes} минут, "
+                         f"границы {min_interval_minutes}-{max_interval_minutes} минут")
         
-        # Планируем следующие проверки
-        schedule.every(interval_minutes).minutes.do(self.process_articles)
+        scheduler = FeedScheduler(interval_minutes * 60, min_interval_minutes * 60, max_interval_minutes * 60)
+        # Все фиды запускаются немедленно
+        for blog in self._shard_blogs():
+            scheduler.add(blog)
+            
+        # Состояние и сводка метрик сохраняются за период, а не за каждую пачку фидов
+        self.metrics.start_cycle()
+        period_start = datetime.now()
+        period_results = {}
+        saved_at = time.monotonic()
         
         try:
             while True:
-                schedule.run_pending()
-                time.sleep(5)
+                if self.reload_sources():
+                    self._sync_schedule(scheduler)
+                    
+                due = scheduler.pop_due()
+                if due:
+                    results = self.process_articles(due, persist=False)
+                    period_results.update(results)
+                    for blog in due:
+                        interval = scheduler.update(blog, results.get(blog['url']))
+                        self.logger.info(f"Следующая проверка {blog['name']} через {interval / 60:.1f} минут")
+                elif self.work_queue is not None:
+                    # Повтор записи, отложенной после ошибок хранилища
+                    self._run_save_stage()
+                    
+                if time.monotonic() - saved_at >= self.state_save_interval:
+                    self._save_state(period_start, period_results)
+                    self.metrics.start_cycle()
+                    period_start = datetime.now()
+                    period_results = {}
+                    saved_at = time.monotonic()
+                        
+                # Спим до ближайшего запуска, но не дольше 30 секунд
+                time.sleep(min(max(scheduler.seconds_until_next(), 1), 30))
         except KeyboardInterrupt:
             self.logger.info("Периодическая проверка остановлена пользователем")
         except Exception as e:
             self.logger.error(f"Ошибка в периодической проверке: {str(e)}")
             raise
+        finally:
+            self._flush_write_buffer()
+            self._save_state(period_start, period_results)
+            self.close()
 
 def main():
     """Основная функция запуска парсера"""
-    parser = ArticleParser()
+    args_parser = argparse.ArgumentParser(description='Парсер статей по тематике ИИ')
+    args_parser.add_argument('mode', nargs='?', choices=['once', 'scheduled'], default='scheduled',
+                             help='once - однократный запуск, scheduled - периодический (по умолчанию)')
+    args_parser.add_argument('--workers', type=int, default=8,
+                             help='число потоков загрузки фидов')
+    args_parser.add_argument('--processes', type=int, default=0,
+                             help='число процессов парсинга (0 - без пула процессов)')
+    args_parser.add_argument('--interval', type=int, default=60,
+                             help='начальный интервал опроса фидов в минутах')
+    args_parser.add_argument('--min-interval', type=int, default=5,
+                             help='минимальный интервал опроса фида в минутах')
+    args_parser.add_argument('--max-interval', type=int, default=24 * 60,
+                             help='максимальный интервал опроса фида в минутах')
+    args_parser.add_argument('--metrics-port', type=int, default=None,
+                             help='порт HTTP-эндпоинта /metrics (по умолчанию выключен)')
+    args_parser.add_argument('--http2', action='store_true',
+                             help='загружать фиды по HTTP/2 (требуется httpx[http2])')
+    args_parser.add_argument('--dns-cache-ttl', type=int, default=0,
+                             help='кэшировать DNS-ответы на заданное число секунд (0 - без кэша)')
+    args_parser.add_argument('--shard-index', type=int, default=0,
+                             help='номер шарда источников, обрабатываемого этим узлом')
+    args_parser.add_argument('--shard-count', type=int, default=1,
+                             help='общее число шардов (узлов)')
+    args_parser.add_argument('--storage', choices=['supabase', 'sqlite', 'jsonl'], default='supabase',
+                             help='хранилище статей (sqlite и jsonl работают без сети)')
+    args_parser.add_argument('--storage-path', default=None,
+                             help='файл локального хранилища (по умолчанию articles.db / articles.jsonl)')
+    args_parser.add_argument('--write-behind', action='store_true',
+                             help='записывать статьи в фоне, при недоступности хранилища - на диск')
+    args_parser.add_argument('--queue', default=None, metavar='PATH',
+                             help='надежная очередь этапов в SQLite (например, work_queue.db): '
+                                  'продолжение после сбоя и повтор неудачной записи')
+    args_parser.add_argument('--queue-max-attempts', type=int, default=8,
+                             help='число попыток записи статей из очереди')
+    args_parser.add_argument('--fetch-content', action='store_true',
+                             help='загружать полный текст новых статей (колонка content)')
+    args_parser.add_argument('--content-workers', type=int, default=4,
+                             help='число потоков загрузки страниц статей')
+    args_parser.add_argument('--near-duplicates', action='store_true',
+                             help='помечать перепечатки одной новости разными источниками (status=duplicate)')
+    args_parser.add_argument('--sources', default=None,
+                             help='файл источников и ключевых слов (JSON или YAML), см. sources.example.json')
+    args_parser.add_argument('--max-feed-mb', type=float, default=20,
+                             help='максимальный размер фида в мегабайтах (загрузка больших фидов прерывается)')
+    args_parser.add_argument('--schema-check', choices=['cached', 'always', 'skip'], default='cached',
+                             help='проверка таблицы Links_articles: один раз (cached), при каждом запуске или никогда')
+    args = args_parser.parse_args()
     
-    if len(sys.argv) > 1 and sys.argv[1] == "once":
+    if args.shard_count < 1 or not 0 <= args.shard_index < args.shard_count:
+        args_parser.error('--shard-index должен быть в диапазоне [0, --shard-count)')
+    
+    parser = ArticleParser(max_workers=args.workers, processes=args.processes,
+                           shard_index=args.shard_index, shard_count=args.shard_count,
+                           metrics_port=args.metrics_port, http2=args.http2,
+                           dns_cache_ttl=args.dns_cache_ttl,
+                           schema_check=args.schema_check, storage=args.storage,
+                           storage_path=args.storage_path, write_behind=args.write_behind,
+                           fetch_content=args.fetch_content, content_workers=args.content_workers,
+                           near_duplicates=args.near_duplicates, sources_path=args.sources,
+                           max_feed_bytes=int(args.max_feed_mb * 1024 * 1024),
+                           queue_path=args.queue, queue_max_attempts=args.queue_max_attempts)
+    
+    if args.mode == "once":
         # Однократный запуск
-        parser.process_articles()
+        try:
+            parser.process_articles()
+        finally:
+            parser.close()
     else:
         # Периодический запуск (по умолчанию)
-        parser.run_scheduled()
+        parser.run_scheduled(args.interval, args.min_interval, args.max_interval)
+
+# Время импорта модуля - часть холодного старта
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
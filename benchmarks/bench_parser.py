@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""Офлайн-бенчмарк этапов парсера статей
+
+Записанные фиды из benchmarks/fixtures раздаются локальным HTTP-сервером,
+а вместо Supabase используется хранящаяся в памяти таблица, поэтому замеры
+не зависят от сети и не трогают рабочую базу. Для каждого этапа выводятся
+пропускная способность (записей в секунду), перцентили задержки и пиковая
+память; результаты можно сохранить как базовые и сравнивать с ними.
+
+Примеры:
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --iterations 50 --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_parser.py --compare benchmarks/baseline.json --tolerance 0.15
+"""
+import argparse
+import json
+import logging
+import math
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import feedparser
+from article_parser import ArticleParser
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Записанные фиды: имя -> (файл, метод парсинга)
+FIXTURES = {
+    'techtarget_malformed': ('techtarget_enterprise_ai.xml', 'direct_request'),
+    'forbes_full_content': ('forbes_ai.xml', None),
+    'verge_atom': ('verge_ai_atom.xml', None),
+}
+
+class FakeResponse:
+    """Ответ в формате клиента Supabase"""
+
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+class FakeQuery:
+    """Построитель запросов к таблице в памяти (подмножество API postgrest)"""
+
+    def __init__(self, table):
+        self.table = table
+        self.operation = 'select'
+        self.filters = []
+        self.payload = None
+        self.bounds = None
+        self.ignore_duplicates = False
+
+    def select(self, *columns, **kwargs):
+        self.operation = 'select'
+        return self
+
+    def limit(self, count):
+        self.bounds = (0, count - 1)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, lambda item: item == value))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append((column, lambda item: item in values))
+        return self
+
+    def insert(self, payload, **kwargs):
+        self.operation = 'insert'
+        self.payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict='', ignore_duplicates=False, **kwargs):
+        self.operation = 'upsert'
+        self.payload = payload
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, payload, **kwargs):
+        self.operation = 'update'
+        self.payload = payload
+        return self
+
+    def execute(self):
+        if self.table.latency:
+            time.sleep(self.table.latency)
+        with self.table.lock:
+            return FakeResponse(getattr(self, f'_execute_{self.operation}')())
+
+    def _matching(self):
+        rows = [row for row in self.table.rows.values()
+                if all(check(row.get(column)) for column, check in self.filters)]
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        return rows
+
+    def _execute_select(self):
+        return [dict(row) for row in self._matching()]
+
+    def _execute_update(self):
+        rows = self._matching()
+        for row in rows:
+            row.update(self.payload)
+        return [dict(row) for row in rows]
+
+    def _execute_insert(self):
+        rows = self.payload if isinstance(self.payload, list) else [self.payload]
+        for row in rows:
+            if row['url'] in self.table.rows:
+                raise Exception('duplicate key value violates unique constraint')
+        for row in rows:
+            self.table.rows[row['url']] = dict(row)
+        return rows
+
+    def _execute_upsert(self):
+        inserted = []
+        for row in (self.payload if isinstance(self.payload, list) else [self.payload]):
+            if row['url'] in self.table.rows:
+                if not self.ignore_duplicates:
+                    self.table.rows[row['url']].update(row)
+                continue
+            self.table.rows[row['url']] = dict(row)
+            inserted.append(row)
+        return inserted
+
+class FakeTable:
+    """Таблица в памяти с уникальным ключом url"""
+
+    def __init__(self, latency=0.0):
+        self.rows = {}
+        self.latency = latency
+        self.lock = threading.Lock()
+
+class FakeSupabaseClient:
+    """Заменитель клиента Supabase: таблицы хранятся в памяти"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = FakeTable(self.latency)
+        return FakeQuery(self.tables[name])
+
+    def rpc(self, name, params=None):
+        return FakeQuery(FakeTable())
+
+def make_large_feed(content, copies):
+    """Большой фид из записанного: записи повторяются с уникальными ссылками"""
+    text = content.decode('utf-8')
+    items = re.findall(r'<item>.*?</item>', text, re.DOTALL)
+    generated = []
+    for copy in range(copies):
+        for item in items:
+            generated.append(item.replace('</link>', f'&amp;copy={copy}</link>')
+                             .replace('</guid>', f'-{copy}</guid>'))
+    head = text[:text.index(items[0])]
+    tail = text[text.rindex(items[-1]) + len(items[-1]):]
+    return (head + '\n'.join(generated) + tail).encode('utf-8')
+
+def load_fixtures(large_copies):
+    """Загрузка записанных фидов и генерация большого фида"""
+    feeds = {}
+    for name, (filename, parse_method) in FIXTURES.items():
+        feeds[name] = ((FIXTURES_DIR / filename).read_bytes(), parse_method)
+    forbes, _ = feeds['forbes_full_content']
+    feeds['forbes_large'] = (make_large_feed(forbes, large_copies), None)
+    return feeds
+
+def serve_fixtures(feeds):
+    """Локальный HTTP-сервер, раздающий фиды из памяти"""
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.strip('/').split('?')[0]
+            if name not in feeds:
+                self.send_error(404)
+                return
+            body = feeds[name][0]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def create_parser(client):
+    """Парсер без сетевых зависимостей: Supabase заменен таблицей в памяти"""
+    return ArticleParser(max_workers=1, host_delay=0, cache_path=None, seen_index_path=None,
+                         metrics_path=None, supabase_client=client)
+
+def percentile(values, fraction):
+    """Перцентиль по методу ближайшего ранга"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+def measure(name, func, iterations):
+    """Замер этапа: func() возвращает число обработанных записей"""
+    func()  # прогрев
+
+    latencies = []
+    entries = 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        entries += func()
+        latencies.append(time.perf_counter() - start)
+
+    # Память замеряется отдельным прогоном, чтобы tracemalloc не искажал время
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    return {
+        'stage': name,
+        'entries_per_sec': entries / total if total else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_kb': peak / 1024,
+    }
+
+def run_benchmarks(iterations, large_copies, db_latency):
+    """Запуск всех замеров"""
+    feeds = load_fixtures(large_copies)
+    server = serve_fixtures(feeds)
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    client = FakeSupabaseClient(db_latency)
+    parser = create_parser(client)
+    results = []
+
+    try:
+        for name, (content, parse_method) in feeds.items():
+            blog = {'name': name, 'url': f'{base_url}/{name}', 'type': 'rss', 'category': 'AI'}
+            if parse_method:
+                blog['parse_method'] = parse_method
+            entries = feedparser.parse(content).entries
+
+            def fetch_parse(blog=blog, count=len(entries)):
+                # Полный цикл для фида: загрузка по HTTP, разбор, фильтрация
+                parser.parse_rss_feed(blog)
+                return count
+
+            def fallback_parse(content=content):
+                return sum(1 for _ in parser._iter_fallback_entries(content))
+
+            def feedparser_parse(content=content):
+                return len(feedparser.parse(content).entries)
+
+            def keyword_filter(entries=entries):
+                for entry in entries:
+                    parser.is_ai_related(entry)
+                return len(entries)
+
+            results.append(measure(f'fetch_parse[{name}]', fetch_parse, iterations))
+            # Только разбор уже загруженного ответа
+            if parse_method == 'direct_request':
+                results.append(measure(f'fallback_parse[{name}]', fallback_parse, iterations))
+            else:
+                results.append(measure(f'feedparser[{name}]', feedparser_parse, iterations))
+            results.append(measure(f'is_ai_related[{name}]', keyword_filter, iterations))
+
+        # Запись: половина статей уже есть в таблице
+        articles, _ = parser._extract_articles(feedparser.parse(feeds['forbes_large'][0]).entries,
+                                               {'name': 'forbes_large', 'url': 'forbes_large', 'category': ''})
+
+        def save_stage():
+            table = client.tables.setdefault('Links_articles', FakeTable(db_latency))
+            table.rows = {article['url']: dict(article) for article in articles[::2]}
+            parser.save_articles_bulk(articles)
+            return len(articles)
+
+        results.append(measure('save_articles_bulk', save_stage, iterations))
+    finally:
+        server.shutdown()
+
+    return results
+
+def print_results(results, baseline=None):
+    """Вывод таблицы результатов (и изменений относительно базовых)"""
+    header = f"{'этап':<40} {'записей/с':>12} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'память КБ':>10}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        line = (f"{result['stage']:<40} {result['entries_per_sec']:>12.0f} {result['p50_ms']:>9.2f} "
+                f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_kb']:>10.0f}")
+        if baseline and result['stage'] in baseline:
+            base = baseline[result['stage']]
+            if base['entries_per_sec']:
+                change = result['entries_per_sec'] / base['entries_per_sec'] - 1
+                line += f"  ({change:+.1%} к базовым)"
+        print(line)
+
+def find_regressions(results, baseline, tolerance):
+    """Этапы, у которых пропускная способность упала или p95 вырос больше допуска"""
+    regressions = []
+    for result in results:
+        base = baseline.get(result['stage'])
+        if not base:
+            continue
+        if base['entries_per_sec'] and result['entries_per_sec'] < base['entries_per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['stage']}: пропускная способность "
+                               f"{result['entries_per_sec']:.0f} < {base['entries_per_sec']:.0f} записей/с")
+        if base['p95_ms'] and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{result['stage']}: p95 {result['p95_ms']:.2f} > {base['p95_ms']:.2f} мс")
+    return regressions
+
+def main():
+    args_parser = argparse.ArgumentParser(description='Офлайн-бенчмарк парсера статей')
+    args_parser.add_argument('--iterations', type=int, default=20, help='число повторов каждого замера')
+    args_parser.add_argument('--large-copies', type=int, default=50,
+                             help='во сколько раз размножить записи для большого фида')
+    args_parser.add_argument('--db-latency', type=float, default=0.0,
+                             help='искусственная задержка запроса к таблице в секундах')
+    args_parser.add_argument('--save-baseline', help='сохранить результаты как базовые в JSON-файл')
+    args_parser.add_argument('--compare', help='сравнить с базовыми результатами из JSON-файла')
+    args_parser.add_argument('--tolerance', type=float, default=0.10,
+                             help='допустимое ухудшение относительно базовых (доля)')
+    args = args_parser.parse_args()
+
+    # Логи парсера на каждую статью (и предупреждения о некорректном XML) исказили бы замеры
+    logging.basicConfig(level=logging.ERROR)
+
+    results = run_benchmarks(args.iterations, args.large_copies, args.db_latency)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({result['stage']: result for result in results}, f, ensure_ascii=False, indent=2)
+        print(f"\nБазовые результаты сохранены в {args.save_baseline}")
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print('\nУхудшения относительно базовых:')
+            for regression in regressions:
+                print(f' - {regression}')
+            sys.exit(1)
+        print('\nУхудшений относительно базовых нет')
+
+if __name__ == "__main__":
+    main()
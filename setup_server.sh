@@ -34,10 +34,10 @@ cat > requirements.txt << 'EOF'
 requests==2.31.0
 feedparser==6.0.10
 python-dotenv==1.0.0
-schedule==1.2.1
 supabase==2.3.0
 python-dateutil==2.8.2
 beautifulsoup4==4.12.2
+lxml==4.9.3
 EOF
 
 # Установка зависимостей